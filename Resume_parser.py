@@ -1,165 +1,96 @@
 # Import all required libraries
 import streamlit as st  # For building the UI
-import os
-import tempfile  # Used to temporarily store uploaded files
-import re  # For text pattern matching
-from datetime import datetime
-from calendar import month_abbr  # For converting month names to numbers
-from docx import Document  # To extract text from .docx files
-from pdfminer.high_level import extract_text as extract_pdf  # To extract text from PDFs
-from nltk.corpus import stopwords  # English stopwords (e.g., "the", "is", etc.)
-from nltk import download  # Downloads missing NLTK resources
-from sentence_transformers import SentenceTransformer, util  # Semantic similarity
-from sklearn.feature_extraction.text import TfidfVectorizer  # TF-IDF vectorizer
-from sklearn.metrics.pairwise import cosine_similarity  # Cosine similarity
 import pandas as pd  # Data manipulation and display
+from utils import extractor, scoring, pipeline  # Extraction and scoring shared with the Flask app
+from utils.cache import extraction_cache_from_config, file_digest
+from utils.dedup import DuplicateDetector
+from utils.results import ResultStore
+from utils.jd_cache import JDCache
+from utils.index import load_tfidf_reference
+import config
 
-# Load English stopwords (download if not found)
-try:
-    STOPWORDS = set(stopwords.words('english'))
-except:
-    download('stopwords')
-    STOPWORDS = set(stopwords.words('english'))
+# Streamlit reruns this whole script on every widget interaction, so all the
+# expensive work below is cached: extraction per file content hash, embeddings
+# per text, and scores per (JD, set of uploads).
 
-# Load SentenceTransformer model once using Streamlit cache
+extractor.configure_pdf_from_config()
+
+# Load the SentenceTransformer once per server, behind a per-text embedding cache
 @st.cache_resource
 def load_model():
-    return SentenceTransformer("all-MiniLM-L6-v2")
+    model = scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, allow_download=config.MODEL_ALLOW_DOWNLOAD,
+                                  backend=config.MODEL_BACKEND)
+    return scoring.CachedEncoder(model, config.EMBEDDING_CACHE_SIZE)
 
-st_model = load_model()
+# Load predefined skills from a text file
+@st.cache_resource
+def load_skills():
+    return extractor.load_skills(config.SKILLS_FILE)
 
-# Extract text from PDF file
-def extract_text_from_pdf(file):
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(file.read())
-        tmp_path = tmp.name
-    try:
-        return extract_pdf(tmp_path)
-    finally:
-        os.unlink(tmp_path)
+# The on-disk extraction cache is the same one the Flask app uses
+@st.cache_resource
+def load_extraction_cache():
+    return extraction_cache_from_config()
 
-# Extract text from DOCX file
-def extract_text_from_docx(file):
-    doc = Document(file)
-    return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+# Precomputed job descriptions, shared with the Flask app's on-disk tier
+@st.cache_resource
+def load_jd_cache():
+    return JDCache(load_skills(), capacity=config.JD_CACHE_SIZE, ttl=config.JD_CACHE_TTL,
+                   path=config.JD_CACHE_PATH if config.JD_CACHE_PERSIST else None)
 
-# Clean text by lowering case and removing extra spaces
-def clean_text(text):
-    return re.sub(r'\s+', ' ', text.lower()).strip()
+# The prebuilt TF-IDF reference shared with the Flask app, so both rank uploads the same way
+@st.cache_resource
+def tfidf_reference():
+    return load_tfidf_reference(config.TFIDF_REFERENCE_PATH)
+
+# Parse one upload; keyed on its content hash (arguments starting with _ are not hashed)
+@st.cache_data(max_entries=config.STREAMLIT_CACHE_ENTRIES, show_spinner=False)
+def parse_upload(digest, filename, _data):
+    cache = load_extraction_cache()
+    record = cache.get(digest) if cache is not None else None
+    if record is None:
+        record = pipeline.parse_resume(filename, _data, load_skills())
+        if record is not None and cache is not None:
+            cache.put(digest, record)
+    return record
+
+# Score every parsed upload against the JD; reruns only when the JD or the (filename, hash) set changes
+@st.cache_data(max_entries=config.STREAMLIT_CACHE_ENTRIES, show_spinner=False)
+def score_uploads(jd_text, uploads, _parsed):
+    options = {'tfidf_reference': tfidf_reference()}
+    if config.CASCADE_ENABLED:
+        options.update(cascade_top_n=config.CASCADE_TOP_N, cascade_threshold=config.CASCADE_THRESHOLD)
+    if config.DEDUP_ENABLED:
+        options['dedup'] = DuplicateDetector(config.DEDUP_THRESHOLD)
+    scored = []
+    jd = load_jd_cache().get(jd_text, load_model())
+    for chunk in pipeline.score_parsed(_parsed, jd, load_skills(), load_model(),
+                                       batch_size=config.EMBEDDING_BATCH_SIZE, **options):
+        scored.extend((score, stage, duplicate_of) for _, _, _, score, stage, duplicate_of in chunk)
+    return scored
+
+# Column headers shown in the results table and CSV
+def display_row(row):
+    return {
+        'Filename': row['filename'],
+        'Name': row['name'],
+        'Email': row['email'],
+        'Phone': row['phone'],
+        'Education': row['education'],
+        'Experience (yrs)': row['years_exp'],
+        'Skills': row['skills'],
+        'Match Score': row['score'],
+        'Stage': row['stage'],
+        'Duplicate Of': row['duplicate_of'] or ''
+    }
 
-# Load predefined skills from a text file
-def load_skills(path='skills.txt'):
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            return [line.strip().lower() for line in f if line.strip()]
-    except:
-        return []
-
-# Extract basic info: Name, Email, Phone from resume text
-def extract_basic_info(text):
-    name, email, phone = '', '', ''
-    lines = text.strip().split('\n')
-    for line in lines:
-        line = line.strip()
-        if name == '' and re.match(r'^[a-zA-Z\s]{2,30}$', line):
-            name = line.title()
-        if not email:
-            match = re.search(r"[\w\.-]+@[\w\.-]+\.\w+", line)
-            if match: email = match.group()
-        if not phone:
-            match = re.search(r'\+?\d[\d\s\-\(\)]{7,}', line)
-            if match: phone = match.group()
-    return {'name': name, 'email': email, 'phone': phone}
-
-# Extract matching skills from resume using given skills list
-def extract_skills(text, skills_list):
-    text = text.lower()
-    found = []
-    for skill in skills_list:
-        if re.search(r'\b' + re.escape(skill) + r'\b', text):
-            found.append(skill)
-    return list(set(found))
-
-# Extract education qualification
-def extract_education(text):
-    edu_patterns = [
-        r"(bachelor|b\.tech|b\.sc|m\.sc|m\.tech|master|ph\.d|mba|bca|mca|diploma)\s*(of|in)?\s*[\w\s,]*",
-    ]
-    for pattern in edu_patterns:
-        match = re.search(pattern, text.lower())
-        if match:
-            return match.group().title()
-    return "Not Found"
-
-# Calculate years of experience from dates in text
-def extract_experience_years(text):
-    date_patterns = [
-        r"((jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s\-]*\d{4})\s*(to|-|–)\s*((jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*[\s\-]*\d{4}|present)",
-        r"(\d{4})\s*(to|-|–)\s*(\d{4}|present)"
-    ]
-    total_months = 0
-    for pattern in date_patterns:
-        matches = re.findall(pattern, text.lower())
-        for match in matches:
-            start = match[0]
-            end = match[-1]
-            s_date = parse_date(start)
-            e_date = parse_date(end) if 'present' not in end else datetime.now()
-            if s_date and e_date:
-                months = (e_date.year - s_date.year) * 12 + (e_date.month - s_date.month)
-                if months > 0:
-                    total_months += months
-    return round(total_months / 12, 1)
-
-# Helper function to convert date string to datetime object
-def parse_date(date_str):
-    try:
-        date_str = date_str.lower()
-        month_map = {m.lower(): i for i, m in enumerate(month_abbr) if m}
-        for name, num in month_map.items():
-            if name in date_str:
-                year = re.search(r'\d{4}', date_str)
-                return datetime(int(year.group()), num, 1)
-        if re.match(r'\d{4}', date_str):
-            return datetime(int(date_str), 1, 1)
-    except:
-        return None
-    return None
-
-# TF-IDF based textual similarity
-def compute_tfidf_score(resume, jd):
-    vectorizer = TfidfVectorizer(stop_words='english')
-    vec = vectorizer.fit_transform([resume, jd])
-    return cosine_similarity(vec[0], vec[1])[0][0] * 100
-
-# Semantic similarity using transformer embeddings
-def compute_semantic_score(resume, jd):
-    emb1 = st_model.encode(resume, convert_to_tensor=True)
-    emb2 = st_model.encode(jd, convert_to_tensor=True)
-    return util.cos_sim(emb1, emb2).item() * 100
-
-# Skill matching score
-def compute_skill_score(resume_skills, jd_skills):
-    if not jd_skills:
-        return 0
-    matched = set(resume_skills).intersection(set(jd_skills))
-    return len(matched) / len(jd_skills) * 100
-
-# Final score combining TF-IDF, semantic and skill match
-def compute_hybrid_score(tfidf, semantic, skill):
-    return round(0.3 * tfidf + 0.5 * semantic + 0.2 * skill, 2)
-  
-  
-  
-  
 
 # Streamlit UI starts here
 st.set_page_config(page_title="AI Resume Analyzer", layout="wide")
 st.title("📄 AI Resume Analyzer")
 st.markdown("Upload resumes, paste JD, and get powerful similarity insights!")
-
-# Load skills from file
-skills_list = load_skills('skills.txt')
+if tfidf_reference() is None:
+    st.warning(f"No TF-IDF reference at {config.TFIDF_REFERENCE_PATH}: run `python -m utils.index --tfidf-reference`.")
 
 # Job description input box
 jd_text = st.text_area("Paste the Job Description", height=200)
@@ -171,70 +102,43 @@ uploaded_files = st.file_uploader(
     accept_multiple_files=True
 )
 
-# Analyze button
-analyze_button = st.button("🔍 Analyze")
-
-# If analyze is clicked and JD + resumes are provided
-if analyze_button and jd_text.strip() and uploaded_files:
-    cleaned_jd = clean_text(jd_text)
-    jd_skills = extract_skills(jd_text, skills_list)
+# Analyze button; once pressed, results stay on screen across reruns
+if st.button("🔍 Analyze"):
+    st.session_state['analyzed'] = True
 
-    results = []
+# If analyze was clicked and JD + resumes are provided
+if st.session_state.get('analyzed') and jd_text.strip() and uploaded_files:
+    parsed, uploads = [], []
     for file in uploaded_files:
         filename = file.name
-
-        # Extract text based on file type
-        if filename.endswith(".pdf"):
-            text = extract_text_from_pdf(file)
-        elif filename.endswith(".docx"):
-            text = extract_text_from_docx(file)
-        else:
+        if not filename.endswith(pipeline.SUPPORTED_EXTENSIONS):
             st.warning(f"Unsupported file type: {filename}")
             continue
 
-        if not text or not text.strip():
+        data = file.getvalue()
+        digest = file_digest(data)
+        record = parse_upload(digest, filename, data)
+        if record is None:
             st.warning(f"Could not extract text from {filename}")
             continue
+        parsed.append((filename, record, None))
+        uploads.append((filename, digest))
 
-        # Extract fields from resume
-        info = extract_basic_info(text)
-        resume_skills = extract_skills(text, skills_list)
-        education = extract_education(text)
-        years_exp = extract_experience_years(text)
-
-        # Merge relevant text for scoring
-        merged_text = clean_text(text) + ' ' + ' '.join(resume_skills) + ' ' + education
-
-        # Compute all 3 scores
-        tfidf_score = compute_tfidf_score(merged_text, cleaned_jd)
-        semantic_score = compute_semantic_score(merged_text, cleaned_jd)
-        skill_score = compute_skill_score(resume_skills, jd_skills)
-
-        # Hybrid score
-        final_score = compute_hybrid_score(tfidf_score, semantic_score, skill_score)
-
-        # Store the result
-        results.append({
-            'Filename': filename,
-            'Name': info['name'],
-            'Email': info['email'],
-            'Phone': info['phone'],
-            'Education': education,
-            'Experience (yrs)': years_exp,
-            'Skills': ', '.join(resume_skills),
-            'Match Score': final_score
-        })
-
-    # Sort results by score descending
-    results.sort(key=lambda x: x['Match Score'], reverse=True)
-    df_results = pd.DataFrame(results)
-
-    # Display results table
-    st.subheader("📊 Matching Results")
-    st.dataframe(df_results, use_container_width=True)
+    store = ResultStore()
+    scores = score_uploads(jd_text, tuple(uploads), parsed) if parsed else []
+    for (filename, record, _), (score, stage, duplicate_of) in zip(parsed, scores):
+        store.append(filename, record, score, stage, duplicate_of)
 
-    # Offer CSV download
-    csv = df_results.to_csv(index=False).encode('utf-8')
+    # Display one page of the ranking; rows are picked with a heap, not a full sort
+    st.subheader("📊 Matching Results")
+    pages = store.pages(config.RESULTS_PAGE_SIZE)
+    page = st.number_input("Page", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    st.dataframe(pd.DataFrame([display_row(row) for row in store.page(page, config.RESULTS_PAGE_SIZE)]),
+                 use_container_width=True)
+    st.caption(f"{len(store)} resumes ranked")
+
+    # Offer CSV download of the full ranking
+    csv = pd.DataFrame([display_row(store.row(i)) for i in store.top(len(store))]).to_csv(index=False).encode('utf-8')
     st.download_button(
         label="⬇️ Download Results as CSV",
         data=csv,
@@ -1,61 +1,418 @@
-from flask import Flask, render_template, request, flash
-from utils import extractor, scoring
+import os
+import time
+import json
+import uuid
+import logging
+import threading
+import cProfile
+from collections import OrderedDict
+from flask import Flask, render_template, request, flash, jsonify, g, Response, abort, url_for, stream_with_context
+from utils import extractor, scoring, pipeline, metrics
+from utils.cache import extraction_cache_from_config
+from utils.index import ResumeIndex, EMBEDDINGS_FILE, load_tfidf_reference
+from utils.jobs import JobStore, JobQueue, QueueFull
+from utils.dedup import DuplicateDetector
+from utils.results import ResultStore
+from utils.jd_cache import JDCache
+from utils.model_server import RemoteModel, load_authkey
 import config
 
 app = Flask(__name__)
 app.secret_key = 'dev'  # lightweight, non-secret placeholder
 
+metrics.enable(config.METRICS_ENABLED)
+extractor.configure_pdf_from_config()
+
 # Initialize once
 skills_list = extractor.load_skills(config.SKILLS_FILE)
-st_model = scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL)
+# Extraction workers start without fork and re-import this module as
+# __mp_main__; they only parse files, so they skip the background loads below.
+parse_worker = __name__ == '__mp_main__'
+# The model loads (and warms up) in a background thread; requests that need
+# it block in get_st_model() until it is ready. With a model server, workers
+# never load it and encode through the server instead.
+if parse_worker:
+    st_model_loader = None
+elif config.MODEL_SERVER_SOCKET:
+    st_model_loader = RemoteModel(config.MODEL_SERVER_SOCKET,
+                                  load_authkey(config.MODEL_SERVER_DIR, config.MODEL_SERVER_AUTHKEY),
+                                  timeout=config.MODEL_LOAD_TIMEOUT)
+else:
+    st_model_loader = scoring.BackgroundModel(
+        config.SENTENCE_TRANSFORMER_MODEL,
+        allow_download=config.MODEL_ALLOW_DOWNLOAD,
+        warmup=config.MODEL_WARMUP,
+        backend=config.MODEL_BACKEND
+    )
+extraction_cache = extraction_cache_from_config()
+# Cleaned text, skills, TF-IDF terms and embedding of recently scored JDs
+jd_cache = JDCache(
+    skills_list,
+    capacity=config.JD_CACHE_SIZE,
+    ttl=config.JD_CACHE_TTL,
+    path=config.JD_CACHE_PATH if config.JD_CACHE_PERSIST else None
+)
+resume_index = None
+# The prebuilt TF-IDF reference (`python -m utils.index --tfidf-reference`) is
+# read in the background too; it is never fitted on the request path.
+tfidf_reference_state = {}
+tfidf_reference_loaded = threading.Event()
+
+def load_tfidf_reference_in_background():
+    try:
+        tfidf_reference_state['reference'] = load_tfidf_reference(config.TFIDF_REFERENCE_PATH)
+    except (OSError, ValueError, KeyError) as e:
+        logging.error(f"Could not load the TF-IDF reference {config.TFIDF_REFERENCE_PATH}: {e}")
+        tfidf_reference_state['reference'] = None
+    finally:
+        tfidf_reference_loaded.set()
+
+if not parse_worker:
+    threading.Thread(target=load_tfidf_reference_in_background, name='tfidf-reference-loader', daemon=True).start()
+
+st_model = None
+
+def get_st_model():
+    """
+    The loaded model behind a per-text embedding cache; waits for the background load.
+    """
+    global st_model
+    if st_model is None:
+        st_model = scoring.CachedEncoder(st_model_loader.get(config.MODEL_LOAD_TIMEOUT),
+                                         config.EMBEDDING_CACHE_SIZE)
+    return st_model
+
+def get_jd(jd_text):
+    """
+    The precomputed, embedded JobDescription for jd_text, shared across requests.
+    """
+    return jd_cache.get(jd_text, get_st_model())
+
+def get_resume_index():
+    """
+    Open the prebuilt corpus index on first use; None until `python -m utils.index` has run.
+    """
+    global resume_index
+    if resume_index is None and os.path.exists(os.path.join(config.INDEX_DIR, EMBEDDINGS_FILE)):
+        resume_index = ResumeIndex(config.INDEX_DIR)
+    return resume_index
+
+def get_tfidf_reference():
+    """
+    The TF-IDF reference every batch is scored against, so the upload form,
+    /stream and jobs rank the same resumes the same way; None when
+    TFIDF_REFERENCE_PATH has not been built.
+    """
+    tfidf_reference_loaded.wait(config.MODEL_LOAD_TIMEOUT)
+    return tfidf_reference_state.get('reference')
+
+job_queue = None
+job_queue_lock = threading.Lock()
+recent_results = OrderedDict()
+results_lock = threading.Lock()
+
+def scoring_options():
+    """
+    TF-IDF reference, cascade and duplicate-detection keyword arguments for
+    pipeline.score_parsed, with a fresh detector per batch.
+    """
+    options = {'tfidf_reference': get_tfidf_reference()}
+    if config.CASCADE_ENABLED:
+        options.update(cascade_top_n=config.CASCADE_TOP_N, cascade_threshold=config.CASCADE_THRESHOLD)
+    if config.DEDUP_ENABLED:
+        options['dedup'] = DuplicateDetector(config.DEDUP_THRESHOLD)
+    return options
+
+def upload_warning(filename, error):
+    if error == 'timeout':
+        return f"⏱️ Timed out extracting text from {filename}", 'danger'
+    return f"⚠️ Could not extract text from {filename}", 'warning'
+
+def read_uploads(files):
+    """
+    Split uploaded files into (filename, bytes) pairs and warnings for unsupported types.
+    """
+    uploads, warnings = [], []
+    for file in files:
+        filename = file.filename
+        if not filename.endswith(pipeline.SUPPORTED_EXTENSIONS):
+            warnings.append((f"❌ Unsupported file type: {filename}", 'danger'))
+            metrics.increment('resume_files_failed_total', reason='unsupported')
+            continue
+        uploads.append((filename, file.read()))
+    return uploads, warnings
+
+def run_job(job_id, jd_text, uploads, store):
+    parsed = pipeline.iter_parse_resumes(
+        uploads, skills_list, cache=extraction_cache,
+        max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT
+    )
+    for chunk in pipeline.score_parsed(parsed, get_jd(jd_text), skills_list, get_st_model(),
+                                       chunk_size=config.JOB_CHUNK_SIZE,
+                                       batch_size=config.EMBEDDING_BATCH_SIZE, **scoring_options()):
+        rows, warnings = [], []
+        for filename, record, error, score, stage, duplicate_of in chunk:
+            if record is None:
+                warnings.append(upload_warning(filename, error)[0])
+            else:
+                rows.append(pipeline.result_row(filename, record, score, stage, duplicate_of))
+        store.add_progress(job_id, rows, warnings, len(chunk))
+
+def get_job_queue():
+    """
+    Start the background job workers on first use rather than at import, so
+    forking servers do not inherit running threads.
+    """
+    global job_queue
+    if job_queue is None:
+        with job_queue_lock:
+            if job_queue is None:
+                job_queue = JobQueue(JobStore(config.JOB_DB_PATH), run_job,
+                                     workers=config.JOB_WORKERS, max_queue=config.JOB_QUEUE_SIZE,
+                                     max_attempts=config.JOB_MAX_ATTEMPTS)
+    return job_queue
+
+@app.before_request
+def resume_jobs():
+    # Any first request, health checks included, resumes jobs left by a restart.
+    get_job_queue()
+
+@app.before_request
+def start_profiling():
+    if config.PROFILING_ENABLED and (request.args.get('profile') or request.headers.get('X-Profile')):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+@app.after_request
+def dump_profile(response):
+    # Streamed bodies (/stream) are generated after this hook returns, so the
+    # profile is dumped when the server closes the response instead.
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        os.makedirs(config.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(config.PROFILE_DIR, f"{request.endpoint}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+
+        def dump():
+            profiler.disable()
+            profiler.dump_stats(path)
+
+        response.call_on_close(dump)
+        response.headers['X-Profile-Path'] = path
+    return response
+
+@app.route('/healthz')
+def healthz():
+    """
+    Readiness check: 200 once the model has loaded and warmed up, 503 before.
+    tfidf_reference is 'missing' when scores fall back to per-batch IDF.
+    """
+    if not tfidf_reference_loaded.is_set():
+        reference = 'loading'
+    else:
+        reference = 'loaded' if tfidf_reference_state.get('reference') is not None else 'missing'
+    if st_model_loader.ready():
+        return jsonify({'status': 'ready', 'tfidf_reference': reference})
+    state = 'failed' if st_model_loader.error is not None else 'loading'
+    return jsonify({'status': state, 'tfidf_reference': reference}), 503
+
+@app.route('/metrics')
+def metrics_endpoint():
+    if not metrics.is_enabled():
+        abort(404)
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/', methods=['GET', 'POST'])
 def index():
-    results = []
     if request.method == 'POST':
         jd_text = request.form.get('jd_text', '')
         files = request.files.getlist('resumes')
         if jd_text.strip() and files:
-            cleaned_jd = extractor.clean_text(jd_text)
-            jd_skills = extractor.extract_skills(jd_text, skills_list)
-            for file in files:
-                filename = file.filename
-                text = None
-                if filename.endswith('.pdf'):
-                    text = extractor.extract_text_from_pdf(file)
-                elif filename.endswith('.docx'):
-                    text = extractor.extract_text_from_docx(file)
+            uploads, warnings = read_uploads(files)
+            for message, category in warnings:
+                flash(message, category)
+
+            parsed = pipeline.parse_resumes(
+                uploads, skills_list, cache=extraction_cache,
+                max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT
+            )
+            store = ResultStore()
+            for chunk in pipeline.score_parsed(parsed, get_jd(jd_text), skills_list, get_st_model(),
+                                               batch_size=config.EMBEDDING_BATCH_SIZE, **scoring_options()):
+                for filename, record, error, score, stage, duplicate_of in chunk:
+                    if record is None:
+                        flash(*upload_warning(filename, error))
+                    else:
+                        store.append(filename, record, score, stage, duplicate_of)
+            return render_results(keep_results(store), store, 1)
+    return render_template('index.html', results=[])
+
+@app.route('/results/<result_id>')
+def results_page(result_id):
+    with results_lock:
+        store = recent_results.get(result_id)
+    if store is None:
+        abort(404)
+    return render_results(result_id, store, request.args.get('page', 1, type=int))
+
+def keep_results(store):
+    """
+    Hold on to the last RESULTS_KEPT result stores so their later pages can be viewed.
+    """
+    result_id = uuid.uuid4().hex
+    with results_lock:
+        recent_results[result_id] = store
+        while len(recent_results) > config.RESULTS_KEPT:
+            recent_results.popitem(last=False)
+    return result_id
+
+def render_results(result_id, store, page):
+    size = config.RESULTS_PAGE_SIZE
+    page = min(max(page, 1), store.pages(size))
+    return render_template('index.html', results=store.page(page, size), result_id=result_id,
+                           page=page, pages=store.pages(size), total=len(store), offset=(page - 1) * size)
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/stream', methods=['POST'])
+def stream():
+    """
+    Server-sent events variant of the index route: each resume's row is pushed
+    as soon as its chunk is scored, so the page can rank results live.
+    """
+    jd_text = request.form.get('jd_text', '')
+    files = request.files.getlist('resumes')
+    if not jd_text.strip() or not files:
+        return jsonify({'error': 'jd_text and resumes are required'}), 400
+    uploads, warnings = read_uploads(files)
+
+    def events():
+        for message, category in warnings:
+            yield sse('warning', {'message': message, 'category': category})
+        parsed = pipeline.iter_parse_resumes(
+            uploads, skills_list, cache=extraction_cache,
+            max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT
+        )
+        scored = 0
+        for chunk in pipeline.score_parsed(parsed, get_jd(jd_text), skills_list, get_st_model(),
+                                           chunk_size=config.STREAM_CHUNK_SIZE,
+                                           batch_size=config.EMBEDDING_BATCH_SIZE, **scoring_options()):
+            for filename, record, error, score, stage, duplicate_of in chunk:
+                if record is None:
+                    message, category = upload_warning(filename, error)
+                    yield sse('warning', {'message': message, 'category': category})
                 else:
-                    flash(f"❌ Unsupported file type: {filename}", 'danger')
-                    continue
-
-                if not text or not text.strip():
-                    flash(f"⚠️ Could not extract text from {filename}", 'warning')
-                    continue
-
-                info = extractor.extract_basic_info(text)
-                resume_skills = extractor.extract_skills(text, skills_list)
-                education = extractor.extract_education(text)
-                years_exp = extractor.extract_experience_years(text)
-
-                merged_text = extractor.clean_text(text) + ' ' + ' '.join(resume_skills) + ' ' + education
-
-                score = scoring.hybrid_score_tfidf_st(
-                    merged_text, cleaned_jd, resume_skills, jd_skills, st_model
-                )
-
-                results.append({
-                    'filename': filename,
-                    'name': info['name'],
-                    'email': info['email'],
-                    'phone': info['phone'],
-                    'education': education,
-                    'years_exp': years_exp,
-                    'skills': ', '.join(resume_skills),
-                    'score': score
-                })
-            results.sort(key=lambda x: x['score'], reverse=True)
-    return render_template('index.html', results=results)
+                    scored += 1
+                    yield sse('result', pipeline.result_row(filename, record, score, stage, duplicate_of))
+        yield sse('done', {'total': len(uploads), 'scored': scored})
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/matrix', methods=['POST'])
+def matrix():
+    """
+    Score the uploaded resumes against every `jd_text` field at once and return
+    the resumes x JDs score matrix with the top candidates for each JD.
+    """
+    jd_texts = [jd_text for jd_text in request.form.getlist('jd_text') if jd_text.strip()]
+    files = request.files.getlist('resumes')
+    k = request.form.get('k', config.SEARCH_TOP_K, type=int)
+    if not jd_texts or not files:
+        return jsonify({'error': 'at least one jd_text and resumes are required'}), 400
+    uploads, warnings = read_uploads(files)
+
+    parsed = pipeline.parse_resumes(
+        uploads, skills_list, cache=extraction_cache,
+        max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT
+    )
+    warnings = [message for message, _ in warnings]
+    warnings += [upload_warning(filename, error)[0] for filename, record, error in parsed if record is None]
+    jds = [jd_cache.get(jd_text) for jd_text in jd_texts]
+    scored, scores = pipeline.score_matrix(parsed, jds, skills_list, get_st_model(),
+                                           batch_size=config.EMBEDDING_BATCH_SIZE)
+    return jsonify({
+        'resumes': [filename for filename, _ in scored],
+        'scores': scores.tolist(),
+        'top': [[{'filename': scored[i][0], 'name': scored[i][1]['info']['name'], 'score': score}
+                 for i, score in top] for top in scoring.top_candidates(scores, k)],
+        'warnings': warnings
+    })
+
+@app.route('/search', methods=['GET', 'POST'])
+def search():
+    jd_text = request.values.get('jd_text', '')
+    k = request.values.get('k', config.SEARCH_TOP_K, type=int)
+    if not jd_text.strip():
+        return jsonify({'error': 'jd_text is required'}), 400
+    index = get_resume_index()
+    if index is None:
+        return jsonify({'error': 'resume index has not been built'}), 503
+    # Route to the nearest categories only; indexes built without centroids are searched in full
+    n_probe = request.values.get('n_probe', config.SEARCH_N_PROBE if index.router else None, type=int)
+    try:
+        index.check_model(get_st_model())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 503
+    try:
+        matches = index.search_text(get_jd(jd_text), get_st_model(), k,
+                                    skill_query=request.values.get('skills'), n_probe=n_probe)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'count': len(index), 'n_probe': n_probe, 'results': matches})
+
+@app.route('/skills')
+def skill_stats():
+    """
+    Resumes matching a boolean skill query (?q=python AND docker, NOT php) and
+    skill frequencies per category, from the corpus index.
+    """
+    index = get_resume_index()
+    if index is None or index.skill_index is None:
+        return jsonify({'error': 'skill index has not been built'}), 503
+    skills = index.skill_index
+    try:
+        bits = skills.query(request.args.get('q', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    limit = request.args.get('limit', config.SEARCH_TOP_K, type=int)
+    rows = skills.to_ids(bits)
+    return jsonify({
+        'count': int(len(rows)),
+        'results': [index.row(int(i)) for i in rows[:limit]],
+        'skills': sorted(skills.skill_counts(bits).items(), key=lambda item: (-item[1], item[0])),
+        'categories': {category: list(counts.items()) for category, counts in skills.category_skill_counts().items()}
+                      if request.args.get('by_category') else None
+    })
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    jd_text = request.form.get('jd_text', '')
+    files = request.files.getlist('resumes')
+    if not jd_text.strip() or not files:
+        return jsonify({'error': 'jd_text and resumes are required'}), 400
+    uploads, warnings = read_uploads(files)
+    try:
+        job_id = get_job_queue().submit(jd_text, uploads, [message for message, _ in warnings])
+    except QueueFull:
+        response = jsonify({'error': 'job queue is full, retry later'})
+        response.headers['Retry-After'] = str(config.JOB_RETRY_AFTER)
+        return response, 429
+    return jsonify({'job_id': job_id, 'status_url': url_for('job_status', job_id=job_id)}), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    page = request.args.get('page', type=int)
+    size = request.args.get('per_page', config.RESULTS_PAGE_SIZE, type=int)
+    if page is None:
+        job = get_job_queue().store.get(job_id)
+    else:
+        job = get_job_queue().store.get(job_id, limit=size, offset=(max(page, 1) - 1) * size)
+    if job is None:
+        abort(404)
+    return jsonify(job)
 
 if __name__ == '__main__':
     app.run(debug=True)
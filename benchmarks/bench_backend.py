@@ -0,0 +1,125 @@
+# benchmarks/bench_backend.py
+"""
+Check a faster inference backend against the fp32 baseline on the bundled data/ corpus.
+
+    python -m benchmarks.bench_backend --backend int8 --sample 200
+    python -m benchmarks.bench_backend --backend onnx --min-spearman 0.995 --output onnx.json
+
+The same sample of resumes is embedded and scored against a few job
+descriptions with the 'torch' (fp32) backend and with --backend. The report
+gives the encode speedup and, per JD, the Spearman rank correlation of the
+hybrid scores, the overlap of the top-k candidates and the largest score
+change. The exit status is 1 when any JD's correlation is below
+--min-spearman, so the check can gate switching config.MODEL_BACKEND.
+"""
+import sys
+import json
+import time
+import argparse
+import numpy as np
+from utils import extractor, scoring, pipeline
+from utils.cache import extraction_cache_from_config
+from utils.jd_cache import prepare_jd
+from benchmarks.bench_stages import JD_TEXT, sample_corpus
+import config
+
+JD_TEXTS = [
+    JD_TEXT,
+    "Staff accountant to manage general ledger, accounts payable and receivable, month-end close, "
+    "reconciliations and tax filings. CPA preferred, strong Excel and QuickBooks skills required.",
+    "Registered nurse for a busy hospital ward: patient assessment, medication administration, "
+    "care planning and electronic health records. BLS certification and two years of clinical experience.",
+]
+
+def spearman(a, b):
+    from scipy.stats import spearmanr
+    return float(spearmanr(a, b).correlation)
+
+def run_backend(backend, texts, jds, resume_skills, st_model_name, batch_size, repeat):
+    """
+    Load one backend, then time encoding the resumes (best of repeat) and score them.
+    """
+    t0 = time.perf_counter()
+    st_model = scoring.load_st_model(st_model_name, allow_download=config.MODEL_ALLOW_DOWNLOAD, backend=backend)
+    load_s = time.perf_counter() - t0
+    st_model.encode(['warmup'], convert_to_numpy=True)
+
+    encode_s = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        scoring.encode_texts(texts, st_model, batch_size)
+        encode_s = min(encode_s, time.perf_counter() - t0)
+    jds = [scoring.JobDescription(jd.cleaned, jd.skills) for jd in jds]
+    scores = scoring.hybrid_score_matrix(texts, jds, resume_skills, [jd.skills for jd in jds], st_model, batch_size)
+    return scores, {'backend': backend, 'load_s': round(load_s, 3), 'encode_s': round(encode_s, 4),
+                    'per_resume_ms': round(encode_s * 1000 / max(len(texts), 1), 3)}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare an inference backend with the fp32 baseline on data/.')
+    parser.add_argument('--backend', choices=[b for b in scoring.MODEL_BACKENDS if b != 'torch'],
+                        default=config.MODEL_BACKEND if config.MODEL_BACKEND != 'torch' else 'int8')
+    parser.add_argument('--data', default=config.DATA_DIR)
+    parser.add_argument('--sample', type=int, default=200, help='number of resumes (0 = whole corpus)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='encode passes per backend; the fastest counts')
+    parser.add_argument('--k', type=int, default=10, help='top-k used for the candidate overlap')
+    parser.add_argument('--min-spearman', type=float, default=0.99)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    extractor.configure_pdf_from_config()
+    cache = extraction_cache_from_config()
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    uploads = []
+    for path in sample_corpus(args.data, args.sample, args.seed):
+        with open(path, 'rb') as f:
+            uploads.append((path, f.read()))
+    records = [record for _, record, _ in pipeline.parse_resumes(uploads, skills_list, cache=cache) if record]
+    texts = [pipeline.scoring_text(record) for record in records]
+    resume_skills = [record['skills'] for record in records]
+    jds = [prepare_jd(text, skills_list) for text in JD_TEXTS]
+
+    baseline, baseline_run = run_backend('torch', texts, jds, resume_skills, config.SENTENCE_TRANSFORMER_MODEL,
+                                         config.EMBEDDING_BATCH_SIZE, args.repeat)
+    candidate, candidate_run = run_backend(args.backend, texts, jds, resume_skills, config.SENTENCE_TRANSFORMER_MODEL,
+                                           config.EMBEDDING_BATCH_SIZE, args.repeat)
+
+    per_jd = []
+    for j in range(len(jds)):
+        top_base = {i for i, _ in scoring.top_candidates(baseline[:, [j]], args.k)[0]}
+        top_candidate = {i for i, _ in scoring.top_candidates(candidate[:, [j]], args.k)[0]}
+        per_jd.append({
+            'jd': j,
+            'spearman': round(spearman(baseline[:, j], candidate[:, j]), 5),
+            'top_k_overlap': round(len(top_base & top_candidate) / max(len(top_base), 1), 3),
+            'max_abs_diff': round(float(np.abs(baseline[:, j] - candidate[:, j]).max()), 3) if len(texts) else 0.0
+        })
+    speedup = baseline_run['encode_s'] / candidate_run['encode_s'] if candidate_run['encode_s'] else 0.0
+    passed = all(row['spearman'] >= args.min_spearman for row in per_jd)
+
+    report = {
+        'sample': len(uploads),
+        'parsed': len(texts),
+        'seed': args.seed,
+        'k': args.k,
+        'runs': [baseline_run, candidate_run],
+        'speedup': round(speedup, 2),
+        'jds': per_jd,
+        'min_spearman': args.min_spearman,
+        'passed': passed
+    }
+    print(f"{args.backend}: {speedup:.2f}x encode speedup over fp32 on {len(texts)} resumes", file=sys.stderr)
+    for row in per_jd:
+        print(f"  JD {row['jd']}: spearman {row['spearman']:.4f}, top-{args.k} overlap {row['top_k_overlap']:.2f}, "
+              f"max score change {row['max_abs_diff']:.2f}", file=sys.stderr)
+    print('PASS' if passed else f'FAIL: rank correlation below {args.min_spearman}', file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
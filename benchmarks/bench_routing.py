@@ -0,0 +1,145 @@
+# benchmarks/bench_routing.py
+"""
+Recall vs speed of category routing on an index built by `python -m utils.index`.
+
+    python -m benchmarks.bench_routing --queries 200 --k 10 --probes 1 2 4 8
+    python -m benchmarks.bench_routing --jd backend.txt analyst.txt
+
+Queries are a deterministic sample of the indexed resumes themselves (each
+one's own row is excluded from its results), plus any --jd files. For every
+probe count the report gives recall@k against the exhaustive search, the share
+of the corpus scored, p50/p95 latency including routing, and how often a
+resume query's own category was among those probed.
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import numpy as np
+from utils import extractor, scoring, pipeline
+from utils.cache import extraction_cache_from_config
+from utils.index import ResumeIndex
+from utils.jd_cache import prepare_jd
+from benchmarks.bench_stages import percentile
+import config
+
+def load_queries(index, size, seed, jd_paths, skills_list):
+    """
+    (JobDescription, own row or None, own category or None) per query.
+    """
+    rows = list(range(len(index)))
+    random.Random(seed).shuffle(rows)
+    rows = sorted(rows[:size])
+    cache = extraction_cache_from_config()
+    uploads = []
+    for i in rows:
+        with open(index.metadata['path'][i], 'rb') as f:
+            uploads.append((index.metadata['path'][i], f.read()))
+    queries = []
+    for i, (_, record, _) in zip(rows, pipeline.parse_resumes(uploads, skills_list, cache=cache)):
+        if record is not None:
+            queries.append((scoring.JobDescription(pipeline.scoring_text(record), record['skills']),
+                            i, index.metadata['category'][i]))
+    for path in jd_paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            queries.append((prepare_jd(f.read(), skills_list), None, None))
+    return queries
+
+def top_rows(index, embedding, k, rows, own):
+    return [i for i, _ in index.search(embedding, k + 1, rows) if i != own][:k]
+
+def benchmark(index, queries, st_model, k, probes, repeat=5):
+    for jd, _, _ in queries:
+        jd.embed(st_model)
+    exact, latencies = [], []
+    for jd, own, _ in queries:
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            found = top_rows(index, jd.embedding, k, None, own)
+        latencies.append((time.perf_counter() - t0) / repeat)
+        exact.append(set(found))
+    baseline_p50 = percentile(latencies, 0.50)
+    results = [{
+        'n_probe': None,
+        'recall_at_k': 1.0,
+        'scored_fraction': 1.0,
+        'p50_ms': round(baseline_p50 * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'speedup': 1.0
+    }]
+
+    for n_probe in probes:
+        recalls, fractions, latencies, hits = [], [], [], []
+        for (jd, own, category), expected in zip(queries, exact):
+            t0 = time.perf_counter()
+            for _ in range(repeat):
+                rows, categories = index.probe_rows(jd, st_model, n_probe)
+                found = top_rows(index, jd.embedding, k, np.sort(rows), own)
+            latencies.append((time.perf_counter() - t0) / repeat)
+            recalls.append(len(expected.intersection(found)) / max(len(expected), 1))
+            fractions.append(len(rows) / len(index))
+            if category is not None:
+                hits.append(category in categories)
+        p50 = percentile(latencies, 0.50)
+        results.append({
+            'n_probe': n_probe,
+            'recall_at_k': round(float(np.mean(recalls)), 4),
+            'scored_fraction': round(float(np.mean(fractions)), 4),
+            'p50_ms': round(p50 * 1000, 3),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+            'speedup': round(baseline_p50 / p50, 2) if p50 else 0.0,
+            'category_hit_rate': round(float(np.mean(hits)), 4) if hits else None
+        })
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure recall vs speed of category-routed search.')
+    parser.add_argument('--index', default=config.INDEX_DIR)
+    parser.add_argument('--queries', type=int, default=200, help='indexed resumes used as queries')
+    parser.add_argument('--jd', nargs='*', default=[], help='job description text files to add as queries')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--probes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    index = ResumeIndex(args.index)
+    if index.router is None:
+        parser.error(f'{args.index} has no category centroids; rebuild it with `python -m utils.index`')
+    extractor.configure_pdf_from_config()
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    st_model = scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, backend=config.MODEL_BACKEND)
+    try:
+        index.check_model(st_model)
+    except ValueError as e:
+        parser.error(str(e))
+    queries = load_queries(index, args.queries, args.seed, args.jd, skills_list)
+    results = benchmark(index, queries, st_model, args.k, args.probes)
+
+    print(f"{'n_probe':>8}{'recall@' + str(args.k):>11}{'scored':>9}{'p50_ms':>9}{'speedup':>9}{'cat_hit':>9}",
+          file=sys.stderr)
+    for row in results:
+        hit = row.get('category_hit_rate')
+        print(f"{row['n_probe'] or 'all':>8}{row['recall_at_k']:>11.3f}{row['scored_fraction']:>9.3f}"
+              f"{row['p50_ms']:>9.3f}{row['speedup']:>9.2f}{'-' if hit is None else f'{hit:.3f}':>9}",
+              file=sys.stderr)
+
+    report = {
+        'index': args.index,
+        'corpus': len(index),
+        'categories': len(index.router.categories),
+        'queries': len(queries),
+        'k': args.k,
+        'seed': args.seed,
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == '__main__':
+    main()
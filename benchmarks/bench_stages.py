@@ -0,0 +1,177 @@
+# benchmarks/bench_stages.py
+"""
+Per-stage benchmark of the extraction and scoring pipeline over the bundled data/ corpus.
+
+    python -m benchmarks.bench_stages --sample 200 --output baseline.json
+    python -m benchmarks.bench_stages --sample 200 --compare baseline.json
+
+Every stage is timed separately on the same deterministic sample of resumes.
+The JSON report holds throughput, p50/p95 latency and peak traced memory per
+stage (traced with tracemalloc, so native torch/numpy buffers are not
+included); --compare prints the relative change against an earlier report.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from utils import extractor, scoring, pipeline
+from utils.index import iter_corpus
+import config
+
+JD_TEXT = (
+    "We are hiring a senior software engineer with strong Python, SQL and Java skills, "
+    "experience with Django or Flask, cloud platforms such as AWS, and a bachelor's degree "
+    "in computer science. Project management and communication skills are a plus."
+)
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def run_stage(name, func, items, memory_sample=20):
+    """
+    Call func on every item, returning its outputs and a timing/memory summary.
+    Timings come from an untraced pass, since tracemalloc slows pure-Python code
+    several-fold; peak memory is then traced over the first memory_sample items.
+    Batched stages pass a single-item list and report the batch as one call.
+    """
+    latencies, outputs = [], []
+    started = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        outputs.append(func(item))
+        latencies.append(time.perf_counter() - t0)
+    total = time.perf_counter() - started
+
+    tracemalloc.start()
+    for item in items[:memory_sample]:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return outputs, {
+        'stage': name,
+        'calls': len(latencies),
+        'total_s': round(total, 4),
+        'throughput_per_s': round(len(latencies) / total, 2) if total else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'peak_mem_kb': round(peak / 1024, 1)
+    }
+
+def sample_corpus(data_dir, size, seed):
+    corpus = [path for path, _ in iter_corpus(data_dir)]
+    random.Random(seed).shuffle(corpus)
+    return sorted(corpus[:size]) if size else sorted(corpus)
+
+def benchmark(paths, skills_list, st_model, batch_size=32, memory_sample=20):
+    stages = []
+    blobs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            blobs.append((path, f.read()))
+
+    def pdf_text(blob):
+        path, data = blob
+        if path.endswith('.pdf'):
+            return extractor.extract_text_from_pdf(io.BytesIO(data))
+        return extractor.extract_text_from_docx(io.BytesIO(data))
+
+    texts, summary = run_stage('pdf_text', pdf_text, blobs, memory_sample)
+    stages.append(summary)
+    texts = [t for t in texts if t and t.strip()]
+
+    _, summary = run_stage('extract_basic_info', extractor.extract_basic_info, texts, memory_sample)
+    stages.append(summary)
+    skills, summary = run_stage('extract_skills', lambda t: extractor.extract_skills(t, skills_list), texts, memory_sample)
+    stages.append(summary)
+    education, summary = run_stage('extract_education', extractor.extract_education, texts, memory_sample)
+    stages.append(summary)
+    _, summary = run_stage('extract_experience_years', extractor.extract_experience_years, texts, memory_sample)
+    stages.append(summary)
+
+    records = [{'text': t, 'skills': s, 'education': e} for t, s, e in zip(texts, skills, education)]
+    merged = [pipeline.scoring_text(r) for r in records]
+    cleaned_jd = extractor.clean_text(JD_TEXT)
+    jd_skills = extractor.extract_skills(JD_TEXT, skills_list)
+
+    _, summary = run_stage('tfidf', lambda batch: scoring.compute_tfidf_scores(batch, cleaned_jd), [merged])
+    stages.append(summary)
+    _, summary = run_stage('embedding', lambda batch: scoring.compute_semantic_similarities(
+        batch, cleaned_jd, st_model, batch_size), [merged])
+    stages.append(summary)
+    _, summary = run_stage('hybrid_score', lambda batch: scoring.hybrid_scores_tfidf_st(
+        batch, cleaned_jd, skills, jd_skills, st_model, batch_size), [merged])
+    stages.append(summary)
+    top_n = max(1, len(merged) // 10)
+    cascaded, summary = run_stage('cascade_score', lambda batch: scoring.cascade_scores_tfidf_st(
+        batch, cleaned_jd, skills, jd_skills, st_model, top_n=top_n, batch_size=batch_size), [merged])
+    summary['embedded'] = sum(stage == 'semantic' for _, stage in cascaded[0])
+    stages.append(summary)
+
+    # Batched stages ran as a single call; report them per resume as well.
+    for summary in stages[-4:]:
+        summary['per_resume_ms'] = round(summary['total_s'] * 1000 / max(len(merged), 1), 3)
+        summary['throughput_per_s'] = round(len(merged) / summary['total_s'], 2) if summary['total_s'] else 0.0
+    return stages, len(texts)
+
+def compare(current, baseline):
+    previous = {s['stage']: s for s in baseline['stages']}
+    print(f"{'stage':<26}{'total_s':>10}{'baseline':>10}{'change':>9}{'p95_ms':>10}")
+    for stage in current['stages']:
+        before = previous.get(stage['stage'])
+        if not before or not before['total_s']:
+            print(f"{stage['stage']:<26}{stage['total_s']:>10}{'-':>10}{'-':>9}{stage['p95_ms']:>10}")
+            continue
+        change = (stage['total_s'] - before['total_s']) / before['total_s'] * 100
+        print(f"{stage['stage']:<26}{stage['total_s']:>10}{before['total_s']:>10}{change:>+8.1f}%{stage['p95_ms']:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark extraction and scoring stages on data/.')
+    parser.add_argument('--data', default=config.DATA_DIR)
+    parser.add_argument('--sample', type=int, default=200, help='number of resumes (0 = whole corpus)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--memory-sample', type=int, default=20, help='items traced for peak memory per stage')
+    parser.add_argument('--pdf-mode', choices=('fast', 'full'), default='fast' if config.PDF_FAST_MODE else 'full',
+                        help='PDF extraction mode to benchmark')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='baseline JSON report to compare against')
+    args = parser.parse_args(argv)
+
+    paths = sample_corpus(args.data, args.sample, args.seed)
+    extractor.configure_pdf_from_config(fast=args.pdf_mode == 'fast')
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    st_model = scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, backend=config.MODEL_BACKEND)
+    stages, parsed = benchmark(paths, skills_list, st_model, config.EMBEDDING_BATCH_SIZE, args.memory_sample)
+
+    report = {
+        'sample': len(paths),
+        'parsed': parsed,
+        'seed': args.seed,
+        'pdf_mode': args.pdf_mode,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'stages': stages
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+if __name__ == '__main__':
+    main()
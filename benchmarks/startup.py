@@ -0,0 +1,59 @@
+# benchmarks/startup.py
+"""
+Measure how long `import app` takes in a fresh interpreter and check it against
+config.STARTUP_TARGET_SECONDS.
+
+    python -m benchmarks.startup --runs 5
+
+The model loads in a background thread, so this measures the time until the
+server can accept requests, not until /healthz reports ready; pass --wait-ready
+to time that as well. Exits non-zero when the median import time misses the target.
+"""
+import sys
+import json
+import argparse
+import subprocess
+import config
+
+PROBE = '''
+import time, json
+t0 = time.perf_counter()
+import app
+imported = time.perf_counter() - t0
+ready = None
+if {wait_ready}:
+    try:
+        app.st_model_loader.get()
+        ready = time.perf_counter() - t0
+    except Exception:
+        pass
+print(json.dumps({{"import": imported, "ready": ready}}))
+'''
+
+def measure(wait_ready=False):
+    out = subprocess.run([sys.executable, '-c', PROBE.format(wait_ready=wait_ready)],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time a cold import of the Flask app.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--wait-ready', action='store_true', help='also time until the model is loaded and warm')
+    parser.add_argument('--target', type=float, default=config.STARTUP_TARGET_SECONDS)
+    args = parser.parse_args(argv)
+
+    runs = [measure(args.wait_ready) for _ in range(args.runs)]
+    imports = sorted(run['import'] for run in runs)
+    median = imports[len(imports) // 2]
+    print(f"import app: median {median:.3f}s, min {imports[0]:.3f}s, max {imports[-1]:.3f}s "
+          f"(target {args.target:.2f}s)")
+    if args.wait_ready:
+        ready = sorted(run['ready'] for run in runs if run['ready'] is not None)
+        if ready:
+            print(f"model ready: median {ready[len(ready) // 2]:.3f}s")
+        else:
+            print("model ready: failed to load")
+    return 0 if median <= args.target else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,3 +1,78 @@
+import os
+
 SKILLS_FILE = 'skills.txt'
 SENTENCE_TRANSFORMER_MODEL = 'all-MiniLM-L6-v2'
 
+EMBEDDING_BATCH_SIZE = 32
+EMBEDDING_CACHE_SIZE = 4096  # embeddings kept in memory, keyed by text
+
+JD_CACHE_SIZE = 256  # precomputed job descriptions kept in memory
+JD_CACHE_TTL = 24 * 60 * 60  # seconds; None keeps entries until evicted
+JD_CACHE_PERSIST = True  # also keep them on disk across restarts
+JD_CACHE_PATH = 'cache/jds.sqlite3'
+
+EXTRACTION_CACHE_ENABLED = True
+EXTRACTION_CACHE_PATH = 'cache/extractions.sqlite3'
+EXTRACTION_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+PARSE_WORKERS = None  # processes in the shared extraction pool; defaults to os.cpu_count()
+PARSE_TIMEOUT = 60  # seconds per uploaded file
+
+DATA_DIR = 'data'
+INDEX_DIR = 'index'
+TFIDF_REFERENCE_PATH = 'cache/tfidf_reference.json'  # IDF shared by every scored batch
+TFIDF_REFERENCE_SAMPLE = 300  # data/ resumes the reference IDF is fitted on
+SEARCH_TOP_K = 20
+SEARCH_N_PROBE = None  # nearest categories searched per JD; None searches every resume
+CENTROID_TERMS = 2000  # TF-IDF terms kept per category centroid
+
+METRICS_ENABLED = False  # expose per-stage timings on /metrics
+PROFILING_ENABLED = False  # allow ?profile=1 / X-Profile header to dump cProfile stats
+PROFILE_DIR = 'profiles'
+
+JOB_DB_PATH = 'cache/jobs.sqlite3'
+JOB_WORKERS = 2  # jobs processed concurrently
+JOB_QUEUE_SIZE = 16  # queued jobs before /jobs answers 429
+JOB_CHUNK_SIZE = 16  # resumes scored per progress update
+JOB_RETRY_AFTER = 30  # seconds suggested to clients when the queue is full
+JOB_MAX_ATTEMPTS = 2  # runs of a job interrupted by restarts before it is marked failed
+
+MODEL_ALLOW_DOWNLOAD = True  # fetch the model only if it is not in the local cache
+MODEL_BACKEND = 'torch'  # 'torch' (fp32), 'int8' (dynamic int8 quantisation) or 'onnx' (onnxruntime); see benchmarks/bench_backend.py
+MODEL_WARMUP = True  # run one inference after loading so the first request is not slow
+MODEL_LOAD_TIMEOUT = 120  # seconds a request waits for the background model load
+MODEL_SERVER_DIR = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or os.path.expanduser('~/.cache'), 'resume-analyzer')  # private (0700) home of the default socket and authkey
+MODEL_SERVER_SOCKET = None  # Unix socket of `python -m utils.model_server`, e.g. os.path.join(MODEL_SERVER_DIR, 'model.sock'); None loads the model in-process
+MODEL_SERVER_AUTHKEY = os.environ.get('MODEL_SERVER_AUTHKEY')  # shared secret; None uses MODEL_SERVER_DIR/authkey, created on first use
+MODEL_SERVER_BATCH_WINDOW = 0.005  # seconds the server waits for concurrent requests to join a batch
+MODEL_SERVER_MAX_BATCH = 128  # most texts merged into one encode call
+STARTUP_TARGET_SECONDS = 1.5  # budget for `import app`, checked by benchmarks/startup.py
+
+STREAM_CHUNK_SIZE = 4  # resumes scored per batch on /stream; smaller shows the first rows sooner
+
+# Cascade ranking: TF-IDF + skill overlap for every resume, the transformer only
+# for resumes among the best CASCADE_TOP_N stage-one scores seen so far in a
+# run and any at or above CASCADE_THRESHOLD (stage-one scores run 0-50). The
+# rest keep their stage-one score as a lower bound.
+CASCADE_ENABLED = False
+CASCADE_TOP_N = 50
+CASCADE_THRESHOLD = None
+
+# Fast PDF extraction: page by page, stopping at the first limit reached. Set
+# PDF_FAST_MODE = False for pdfminer's extract_text over every page.
+PDF_FAST_MODE = True
+PDF_MAX_PAGES = 10
+PDF_MAX_CHARS = 40000  # enough text for extraction and scoring
+PDF_MAX_BYTES = 20 * 1024 * 1024
+PDF_TIME_LIMIT = 15  # seconds; checked between pages, PARSE_TIMEOUT still bounds a stuck page
+PDF_LAYOUT = 'lines'  # 'lines' skips layout analysis (7-15% faster on data/, same parsed fields); 'full' orders multi-column text by box
+
+STREAMLIT_CACHE_ENTRIES = 512  # parsed files and scored JD/upload sets kept per Streamlit server
+
+# Near-duplicate resumes (MinHash over cleaned text) are scored once per
+# cluster and flagged as duplicates of the first copy.
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.85  # estimated Jaccard similarity of 5-word shingles
+
+RESULTS_PAGE_SIZE = 50  # rows per page of the results table
+RESULTS_KEPT = 8  # recent result sets kept in memory for paging
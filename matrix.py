@@ -0,0 +1,66 @@
+# matrix.py
+"""
+Score every resume under a directory tree against several job descriptions.
+
+    python matrix.py --jd backend.txt data_analyst.txt --data data --output matrix.csv --top-k 10
+
+Each resume and JD is vectorised and embedded once, and the full resumes x
+JDs score matrix is written to --output (CSV, one column per JD). The best
+--top-k candidates for each JD are printed at the end.
+"""
+import os
+import sys
+import csv
+import argparse
+from utils import extractor, scoring, pipeline
+from utils.cache import extraction_cache_from_config
+from rank import iter_uploads
+import config
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a directory of resumes against several job descriptions.')
+    parser.add_argument('--jd', required=True, nargs='+', help='paths to job description text files')
+    parser.add_argument('--data', default=config.DATA_DIR, help='directory tree of PDF/DOCX resumes')
+    parser.add_argument('--output', default='-', help='CSV score matrix; defaults to stdout')
+    parser.add_argument('--top-k', type=int, default=config.SEARCH_TOP_K, help='candidates listed per JD')
+    parser.add_argument('--workers', type=int, default=config.PARSE_WORKERS, help='extraction processes')
+    args = parser.parse_args(argv)
+
+    jd_names, jd_texts = [], []
+    for path in args.jd:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        if not text.strip():
+            parser.error(f'job description is empty: {path}')
+        jd_names.append(os.path.splitext(os.path.basename(path))[0])
+        jd_texts.append(text)
+
+    extractor.configure_pdf_from_config()
+    cache = extraction_cache_from_config()
+
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    parsed = pipeline.iter_parse_resumes(iter_uploads(args.data), skills_list, cache=cache,
+                                         max_workers=args.workers, timeout=config.PARSE_TIMEOUT)
+    scored, matrix = pipeline.score_matrix(
+        parsed, jd_texts, skills_list,
+        scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, backend=config.MODEL_BACKEND),
+        batch_size=config.EMBEDDING_BATCH_SIZE
+    )
+
+    stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(stream)
+        writer.writerow(['path', 'name'] + jd_names)
+        for (path, record), scores in zip(scored, matrix):
+            writer.writerow([path, record['info']['name']] + [f'{score:.2f}' for score in scores])
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    for name, top in zip(jd_names, scoring.top_candidates(matrix, args.top_k)):
+        print(f"Top {len(top)} for {name}:", file=sys.stderr)
+        for rank, (i, score) in enumerate(top, 1):
+            print(f"{rank:>3}. {score:6.2f}  {scored[i][0]}  {scored[i][1]['info']['name']}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
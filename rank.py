@@ -0,0 +1,153 @@
+# rank.py
+"""
+Rank every resume under a directory tree against one job description.
+
+    python rank.py --jd jd.txt --data data --output results.jsonl --top-k 20
+
+Rows are streamed to --output (JSONL or CSV, picked by extension) as soon as
+each chunk is scored, and only a bounded top-k heap is kept in memory for the
+final ranking.
+"""
+import os
+import sys
+import csv
+import json
+import heapq
+import logging
+import argparse
+from utils import extractor, scoring, pipeline
+from utils.cache import extraction_cache_from_config
+from utils.dedup import DuplicateDetector
+from utils.index import tfidf_reference
+import config
+
+OUTPUT_FIELDS = ['path', 'category', 'name', 'email', 'phone', 'education', 'years_exp', 'skills', 'score', 'stage', 'duplicate_of']
+
+def iter_uploads(data_dir):
+    """
+    Lazily read every supported resume under data_dir, in a stable order.
+    """
+    for root, dirs, files in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith(pipeline.SUPPORTED_EXTENSIONS):
+                path = os.path.join(root, name)
+                with open(path, 'rb') as f:
+                    yield path, f.read()
+
+class ResultWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.csv = csv.DictWriter(stream, fieldnames=OUTPUT_FIELDS) if fmt == 'csv' else None
+        if self.csv:
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(dict(row, skills=', '.join(row['skills'])))
+        else:
+            self.stream.write(json.dumps(row) + '\n')
+
+def rank_directory(jd_text, data_dir, writer, st_model, skills_list, top_k=20, chunk_size=64,
+                   cache=None, max_workers=None, timeout=None, batch_size=32,
+                   cascade_top_n=None, cascade_threshold=None, dedup=None, tfidf_reference=None):
+    """
+    Run the extract -> score pipeline over data_dir, writing each scored row as
+    it finishes, and return the top_k rows sorted by score.
+    """
+    heap = []
+    seen = 0
+
+    parsed = pipeline.iter_parse_resumes(iter_uploads(data_dir), skills_list, cache=cache,
+                                         max_workers=max_workers, timeout=timeout)
+    for chunk in pipeline.score_parsed(parsed, jd_text, skills_list, st_model,
+                                       chunk_size=chunk_size, batch_size=batch_size,
+                                       cascade_top_n=cascade_top_n, cascade_threshold=cascade_threshold,
+                                       dedup=dedup, tfidf_reference=tfidf_reference):
+        for path, record, error, score, stage, duplicate_of in chunk:
+            if record is None:
+                logging.warning(f"Skipping {path}: {error}")
+                continue
+            row = {
+                'path': path,
+                'category': os.path.basename(os.path.dirname(path)),
+                'name': record['info']['name'],
+                'email': record['info']['email'],
+                'phone': record['info']['phone'],
+                'education': record['education'],
+                'years_exp': record['years_exp'],
+                'skills': record['skills'],
+                'score': float(score),
+                'stage': stage,
+                'duplicate_of': duplicate_of
+            }
+            writer.write(row)
+            seen += 1
+            entry = (row['score'], -seen, row)
+            if len(heap) < top_k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        writer.stream.flush()
+        logging.info(f"Scored {seen} resumes")
+
+    return [row for _, _, row in sorted(heap, reverse=True)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rank a directory of resumes against a job description.')
+    parser.add_argument('--jd', required=True, help='path to the job description text file')
+    parser.add_argument('--data', default=config.DATA_DIR, help='directory tree of PDF/DOCX resumes')
+    parser.add_argument('--output', default='-', help='streamed results (.jsonl or .csv); defaults to stdout')
+    parser.add_argument('--top-k', type=int, default=config.SEARCH_TOP_K, help='size of the final ranking')
+    parser.add_argument('--chunk-size', type=int, default=64, help='resumes scored per batch')
+    parser.add_argument('--cascade-top-n', type=int,
+                        default=config.CASCADE_TOP_N if config.CASCADE_ENABLED else None,
+                        help='embed only resumes in the best N so far by TF-IDF + skill score')
+    parser.add_argument('--cascade-threshold', type=float,
+                        default=config.CASCADE_THRESHOLD if config.CASCADE_ENABLED else None,
+                        help='also embed any resume whose TF-IDF + skill score reaches this value (0-50)')
+    parser.add_argument('--dedup-threshold', type=float,
+                        default=config.DEDUP_THRESHOLD if config.DEDUP_ENABLED else None,
+                        help='score near-duplicates (estimated Jaccard >= this) once; omit to disable')
+    parser.add_argument('--workers', type=int, default=config.PARSE_WORKERS, help='extraction processes')
+    args = parser.parse_args(argv)
+
+    with open(args.jd, 'r', encoding='utf-8') as f:
+        jd_text = f.read()
+    if not jd_text.strip():
+        parser.error('job description is empty')
+
+    extractor.configure_pdf_from_config()
+    cache = extraction_cache_from_config()
+
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    reference = tfidf_reference(config.TFIDF_REFERENCE_PATH, config.DATA_DIR, skills_list,
+                                sample=config.TFIDF_REFERENCE_SAMPLE, cache=cache,
+                                max_workers=args.workers, timeout=config.PARSE_TIMEOUT)
+
+    fmt = 'csv' if args.output.endswith('.csv') else 'jsonl'
+    stream = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8', newline='')
+    try:
+        top = rank_directory(
+            jd_text, args.data, ResultWriter(stream, fmt),
+            scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, backend=config.MODEL_BACKEND),
+            skills_list,
+            top_k=args.top_k, chunk_size=args.chunk_size, cache=cache,
+            max_workers=args.workers, timeout=config.PARSE_TIMEOUT,
+            batch_size=config.EMBEDDING_BATCH_SIZE,
+            cascade_top_n=args.cascade_top_n, cascade_threshold=args.cascade_threshold,
+            dedup=DuplicateDetector(args.dedup_threshold) if args.dedup_threshold is not None else None,
+            tfidf_reference=reference
+        )
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+
+    print(f"Top {len(top)} matches:", file=sys.stderr)
+    for rank, row in enumerate(top, 1):
+        bound = '>=' if row['stage'] == 'filter' else '  '
+        duplicate = f"  (duplicate of {row['duplicate_of']})" if row['duplicate_of'] else ''
+        print(f"{rank:>3}. {bound}{row['score']:6.2f}  {row['path']}  {row['name']}{duplicate}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# utils/cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from contextlib import contextmanager
+
+CACHE_SCHEMA_VERSION = 1
+
+def file_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+def extractor_version(skills_file):
+    """
+    Fingerprint of everything that can change an extraction result: the cache
+    schema, the extractor source, the PDF extraction options and the skills list.
+    """
+    from utils import extractor
+    digest = hashlib.sha256(str(CACHE_SCHEMA_VERSION).encode())
+    digest.update(json.dumps(extractor.pdf_options(), sort_keys=True).encode())
+    for path in (extractor.__file__, skills_file):
+        try:
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b'missing:' + path.encode())
+    return digest.hexdigest()[:16]
+
+class ExtractionCache:
+    """
+    SQLite-backed cache of extraction results keyed by the SHA-256 of the
+    uploaded file bytes. Entries are tagged with an extractor version and
+    evicted least-recently-used first once the stored payload exceeds max_bytes.
+    Reads only match the current version, so rows from an older one are never
+    served and age out through the same eviction.
+    """
+
+    def __init__(self, path, version, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.version = version
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS extractions ('
+                ' digest TEXT PRIMARY KEY,'
+                ' version TEXT NOT NULL,'
+                ' payload BLOB NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS extractions_accessed ON extractions (accessed)')
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, digest):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT payload FROM extractions WHERE digest = ? AND version = ?',
+                    (digest, self.version)
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute('UPDATE extractions SET accessed = ? WHERE digest = ?', (time.time(), digest))
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Extraction cache read error: {e}")
+            return None
+
+    def put(self, digest, record):
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO extractions (digest, version, payload, size, accessed) VALUES (?, ?, ?, ?, ?)',
+                    (digest, self.version, payload, len(payload), time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            logging.error(f"Extraction cache write error: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM extractions').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in conn.execute('SELECT digest, size FROM extractions ORDER BY accessed').fetchall():
+            conn.execute('DELETE FROM extractions WHERE digest = ?', (digest,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+def extraction_cache_from_config():
+    """
+    The ExtractionCache configured in config.py, or None when it is disabled.
+    Call it after extractor.configure_pdf_from_config(), as the version covers
+    the PDF options.
+    """
+    import config
+    if not config.EXTRACTION_CACHE_ENABLED:
+        return None
+    return ExtractionCache(config.EXTRACTION_CACHE_PATH, extractor_version(config.SKILLS_FILE),
+                           config.EXTRACTION_CACHE_MAX_BYTES)
@@ -0,0 +1,83 @@
+# utils/dedup.py
+import zlib
+import numpy as np
+from utils import extractor, metrics
+
+# Mersenne-style prime just above 2**32; multipliers stay below 2**31 so
+# a * x + b never overflows uint64 for 32-bit shingle hashes.
+_PRIME = np.uint64(4294967311)
+
+class DuplicateDetector:
+    """
+    Incremental near-duplicate clustering of resumes. Each text is reduced to
+    a MinHash signature over word shingles of its cleaned text, and signatures
+    are split into LSH bands. A new text is compared only with the cluster
+    representatives it shares a band with. It joins the most similar one whose
+    estimated Jaccard similarity reaches threshold, or starts a new cluster.
+    Work per text is bounded by the number of colliding representatives, so
+    clustering a corpus stays roughly linear.
+    """
+
+    def __init__(self, threshold=0.85, num_perm=128, bands=32, shingle_size=5, seed=1):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=num_perm, dtype=np.uint64)
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = {}
+        self.parent = {}
+
+    def signature(self, text):
+        words = extractor.clean_text(text).split()
+        k = self.shingle_size
+        if len(words) <= k:
+            shingles = {' '.join(words)}
+        else:
+            shingles = {' '.join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key, text):
+        """
+        Cluster one text and return the key of its cluster's representative,
+        which is key itself when the text starts a new cluster.
+        """
+        signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+
+        best, best_similarity = None, self.threshold
+        for candidate in candidates:
+            similarity = float(np.mean(self._signatures[candidate] == signature))
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is not None:
+            self.parent[key] = best
+            metrics.increment('resume_duplicates_total')
+            return best
+
+        self.parent[key] = key
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, band_keys):
+            bucket.setdefault(band_key, []).append(key)
+        return key
+
+    def clusters(self):
+        """
+        Map each representative key to the keys of its cluster, itself first.
+        """
+        groups = {}
+        for key, representative in self.parent.items():
+            groups.setdefault(representative, []).append(key)
+        return groups
@@ -1,24 +1,31 @@
 # utils/extractor.py
+import io
 import re
-import os
-import tempfile
+import time
 import logging
+from functools import lru_cache, cached_property
 from datetime import datetime
 from calendar import month_abbr
-from pdfminer.high_level import extract_text
-from docx import Document
-from nltk import download
-from nltk.corpus import stopwords
+from utils import metrics
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
-# Ensure stopwords are available
-try:
-    STOPWORDS = set(stopwords.words('english'))
-except LookupError:
-    download('stopwords')
-    STOPWORDS = set(stopwords.words('english'))
+# pdfminer, python-docx and NLTK are imported on first use so importing this
+# module stays cheap and never touches the network.
+@lru_cache(maxsize=1)
+def get_stopwords():
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('english'))
+    except (ImportError, LookupError):
+        logging.warning("NLTK stopwords not installed locally; run nltk.download('stopwords')")
+        return frozenset()
+
+def __getattr__(name):
+    if name == 'STOPWORDS':
+        return get_stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def load_skills(file_path):
     try:
@@ -33,22 +40,128 @@ def load_skills(file_path):
         logging.error(f"Could not load skills file: {e}")
         return []
 
-def extract_text_from_pdf(file):
+# Fast mode extracts page by page, reads at most max_pages pages, stops once
+# max_chars characters are collected or time_limit seconds have passed, and
+# refuses files over max_bytes. layout='lines' skips pdfminer's layout analysis
+# and only splits characters into lines and words by position; layout='full'
+# runs the analysis extract_text uses, which also orders multi-column text box
+# by box. With fast=False the whole document goes through extract_text.
+_pdf_options = {
+    'fast': False,
+    'max_pages': None,
+    'max_chars': None,
+    'max_bytes': None,
+    'time_limit': None,
+    'layout': 'full'
+}
+
+def configure_pdf(**options):
+    unknown = set(options) - set(_pdf_options)
+    if unknown:
+        raise ValueError(f"Unknown PDF options: {', '.join(sorted(unknown))}")
+    _pdf_options.update(options)
+
+def configure_pdf_from_config(**overrides):
+    """
+    Apply the PDF_* settings from config.py; keyword arguments override them.
+    """
+    import config
+    options = dict(fast=config.PDF_FAST_MODE, max_pages=config.PDF_MAX_PAGES, max_chars=config.PDF_MAX_CHARS,
+                   max_bytes=config.PDF_MAX_BYTES, time_limit=config.PDF_TIME_LIMIT,
+                   layout=config.PDF_LAYOUT)
+    options.update(overrides)
+    configure_pdf(**options)
+
+def pdf_options():
+    return dict(_pdf_options)
+
+_line_converter = None
+
+def _line_converter_class():
+    """
+    A TextConverter that writes characters in content-stream order, starting
+    a new line when the baseline moves and a space at a gap between glyphs,
+    instead of grouping them into boxes first.
+    """
+    global _line_converter
+    if _line_converter is None:
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LTChar
+
+        class LineConverter(TextConverter):
+            def receive_layout(self, ltpage):
+                parts, previous = [], None
+                for item in ltpage:
+                    if not isinstance(item, LTChar):
+                        continue
+                    if previous is not None:
+                        if (abs(item.y0 - previous.y0) > max(previous.height, item.height) * 0.5
+                                or item.x0 < previous.x0 - previous.width):
+                            parts.append('\n')
+                        elif (item.x0 - previous.x1 > min(previous.width, item.width) * 0.1
+                              and not previous.get_text().isspace() and not item.get_text().isspace()):
+                            parts.append(' ')
+                    parts.append(item.get_text())
+                    previous = item
+                parts.append('\n\f')
+                self.write_text(''.join(parts))
+
+        _line_converter = LineConverter
+    return _line_converter
+
+def _extract_pdf_fast(file, max_pages=None, max_chars=None, max_bytes=None, time_limit=None, layout='full'):
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
+    from pdfminer.pdfpage import PDFPage
+
+    if max_bytes:
+        file.seek(0, io.SEEK_END)
+        size = file.tell()
+        file.seek(0)
+        if size > max_bytes:
+            logging.warning(f"PDF of {size} bytes exceeds the {max_bytes} byte limit")
+            metrics.increment('pdf_extraction_limited_total', reason='bytes')
+            return None
+
+    started = time.perf_counter()
+    output = io.StringIO()
+    resources = PDFResourceManager()
+    if layout == 'lines':
+        device = _line_converter_class()(resources, output, laparams=None)
+    else:
+        device = TextConverter(resources, output, laparams=LAParams())
+    interpreter = PDFPageInterpreter(resources, device)
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            tmp.write(file.read())
-            tmp_path = tmp.name
-
-        try:
-            return extract_text(tmp_path)
-        finally:
-            os.unlink(tmp_path)
+        for page_number, page in enumerate(PDFPage.get_pages(file, maxpages=max_pages or 0), 1):
+            interpreter.process_page(page)
+            if max_chars and output.tell() >= max_chars:
+                metrics.increment('pdf_extraction_limited_total', reason='chars')
+                break
+            if time_limit and time.perf_counter() - started >= time_limit:
+                logging.warning(f"PDF extraction stopped after {page_number} pages ({time_limit}s limit)")
+                metrics.increment('pdf_extraction_limited_total', reason='time')
+                break
+    finally:
+        device.close()
+    return output.getvalue()
+
+@metrics.timed('extract_text_from_pdf')
+def extract_text_from_pdf(file, **options):
+    options = {**_pdf_options, **options}
+    try:
+        if options.pop('fast'):
+            return _extract_pdf_fast(file, **options)
+        from pdfminer.high_level import extract_text
+        return extract_text(io.BytesIO(file.read()))
     except Exception as e:
         logging.error(f"PDF extract error: {e}")
         return None
 
+@metrics.timed('extract_text_from_docx')
 def extract_text_from_docx(file):
     try:
+        from docx import Document
         doc = Document(file)
         return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
     except Exception as e:
@@ -58,24 +171,107 @@ def extract_text_from_docx(file):
 def clean_text(text):
     return re.sub(r'\s+', ' ', text.lower()).strip() if text else ""
 
+NAME_STOPWORDS = ('email', 'phone', 'address', 'resume', 'cv')
+DIGITS_RE = re.compile(r'\d{3,}')
+EMAIL_RE = re.compile(r"[\w._%+-]+@[\w.-]+\.[a-zA-Z]{2,}")
+# The leading lookahead is implied by the pattern; it lets the scan skip
+# positions that cannot start a phone number without trying every branch.
+PHONE_RE = re.compile(r'(?=[+(\d])(\+?\d{1,3}[\s.-]?)?(\(?\d{2,4}\)?[\s.-]?)?\d{3,4}[\s.-]?\d{3,4}')
+
+DEGREE_PATTERNS = [
+    r'(bachelor(?:s)?(?: of (?:science|arts|engineering|business))?(?: in [\w\s]+)?)',
+    r'(master(?:s)?(?: of (?:science|arts|engineering|business))?(?: in [\w\s]+)?)',
+    r'(b\.?(?:sc|tech|eng|com|a)\.? in [\w\s]+)',
+    r'(m\.?(:?sc|tech|eng|com|a|ba)\.? in [\w\s]+)',
+    r'(ph\.?d\.? in [\w\s]+)',
+    r'(doctorate in [\w\s]+)',
+    r'(associate(?: degree)? in [\w\s]+)',
+    r'(diploma in [\w\s]+)'
+]
+DEGREE_RES = [re.compile(p) for p in DEGREE_PATTERNS]
+# Every degree pattern needs one of these substrings, which is a cheap prefilter.
+DEGREE_HINTS = ('bachelor', 'master', ' in ')
+ANY_DEGREE_RE = re.compile('|'.join(f'(?:{p})' for p in DEGREE_PATTERNS))
+YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+
+EXPERIENCE_HEADING_RE = re.compile(r'\b(experience|employment|work history|professional experience)\b')
+SECTION_END_RE = re.compile(r'\b(education|skills|projects|certifications)\b')
+DATE_RANGE_RES = [
+    re.compile(r'((?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w* \d{4})\s*[-\u2013to]+\s*((?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w* \d{4}|present|current)'),
+    re.compile(r'(\d{1,2}/\d{4})\s*[-\u2013to]+\s*(\d{1,2}/\d{4}|present|current)'),
+    re.compile(r'(\d{4})\s*[-\u2013to]+\s*(\d{4}|present|current)')
+]
+
+MONTH_MAP = {m.lower(): i for i, m in enumerate(month_abbr) if m}
+MONTH_MAP.update({
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+})
+MONTH_YEAR_DATE_RE = re.compile(r'\d{1,2}/\d{4}')
+YEAR_DATE_RE = re.compile(r'\d{4}')
+
+class ParsedResume:
+    """
+    Text of one resume split and lowercased once, with the experience section
+    boundaries detected lazily, so every extractor works off the same pass.
+    """
+
+    def __init__(self, text):
+        self.text = text or ''
+        self.text_lower = self.text.lower()
+        self.lines = self.text.split('\n')
+        self.lower_lines = self.text_lower.split('\n')
+
+    @cached_property
+    def stripped_lines(self):
+        return [line.strip() for line in self.lines if line.strip()]
+
+    @cached_property
+    def experience_bounds(self):
+        start = next((i for i, line in enumerate(self.lower_lines) if EXPERIENCE_HEADING_RE.search(line)), -1)
+        if start == -1:
+            return None
+        end = next((i for i in range(start + 1, len(self.lines)) if SECTION_END_RE.search(self.lower_lines[i])),
+                   len(self.lines))
+        return start, end
+
+    @cached_property
+    def experience_section(self):
+        if self.experience_bounds is None:
+            return self.text
+        start, end = self.experience_bounds
+        return '\n'.join(self.lines[start:end])
+
+    @cached_property
+    def experience_section_lower(self):
+        if self.experience_bounds is None:
+            return self.text_lower
+        start, end = self.experience_bounds
+        return '\n'.join(self.lower_lines[start:end])
+
+def parse_document(text):
+    return text if isinstance(text, ParsedResume) else ParsedResume(text)
+
+@metrics.timed('extract_basic_info')
 def extract_basic_info(text):
-    if not text:
+    doc = parse_document(text)
+    if not doc.text:
         return {'name': '', 'email': '', 'phone': ''}
 
-    lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
     name = ''
-    for line in lines:
-        if any(k in line.lower() for k in ['email', 'phone', 'address', 'resume', 'cv']):
+    for line in doc.stripped_lines:
+        line_lower = line.lower()
+        if any(k in line_lower for k in NAME_STOPWORDS):
             continue
-        if '@' in line or re.search(r'\d{3,}', line):
+        if '@' in line or DIGITS_RE.search(line):
             continue
         if len(line.split()) <= 4 and line.replace(' ', '').isalpha() and not line.isupper():
             name = line.title()
             break
 
-    email = re.search(r"[\w._%+-]+@[\w.-]+\.[a-zA-Z]{2,}", text)
-    phone_pattern = r'(\+?\d{1,3}[\s.-]?)?(\(?\d{2,4}\)?[\s.-]?)?\d{3,4}[\s.-]?\d{3,4}'
-    phone = re.search(phone_pattern, text)
+    email = EMAIL_RE.search(doc.text) if '@' in doc.text else None
+    phone = PHONE_RE.search(doc.text)
 
     return {
         'name': name,
@@ -83,26 +279,72 @@ def extract_basic_info(text):
         'phone': phone.group() if phone else ''
     }
 
+def _skill_variations(skill):
+    return {
+        skill,
+        skill.replace('.', ''),
+        skill.replace('-', ' '),
+        skill.replace('_', ' ')
+    }
+
+def _trie_pattern(node):
+    alternatives = [re.escape(ch) + _trie_pattern(child) for ch, child in node.items() if ch is not None]
+    if None in node:
+        alternatives.append(r'\b')
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return '(?:' + '|'.join(alternatives) + ')'
+
+class SkillMatcher:
+    """Matches every skill variation in a single pass over the text.
+
+    The variations are folded into a character trie which is compiled into one
+    regex; it flags every position where some variation matches with word
+    boundaries on both sides, and the trie is then walked from those positions
+    to collect all skills ending there.
+    """
+
+    def __init__(self, skills_list):
+        self.trie = {}
+        for skill in skills_list:
+            for var in _skill_variations(skill):
+                if not var:
+                    continue
+                node = self.trie
+                for ch in var:
+                    node = node.setdefault(ch, {})
+                node.setdefault(None, set()).add(skill)
+        self.pattern = re.compile(r'\b(?=' + _trie_pattern(self.trie) + ')') if self.trie else None
+        self.boundary = re.compile(r'\b')
+
+    def find(self, text_lower):
+        found_skills = set()
+        if self.pattern is None:
+            return found_skills
+        for match in self.pattern.finditer(text_lower):
+            node = self.trie
+            for pos in range(match.start(), len(text_lower)):
+                node = node.get(text_lower[pos])
+                if node is None:
+                    break
+                if None in node and self.boundary.match(text_lower, pos + 1):
+                    found_skills.update(node[None])
+        return found_skills
+
+@lru_cache(maxsize=8)
+def _cached_skill_matcher(skills):
+    return SkillMatcher(skills)
+
+def get_skill_matcher(skills_list):
+    return _cached_skill_matcher(tuple(skills_list))
+
+@metrics.timed('extract_skills')
 def extract_skills(text, skills_list):
-    if not text or not skills_list:
+    doc = parse_document(text)
+    if not doc.text or not skills_list:
         return []
 
-    text_lower = text.lower()
-    found_skills = set()
-
-    for skill in skills_list:
-        variations = {
-            skill,
-            skill.replace('.', ''),
-            skill.replace('-', ' '),
-            skill.replace('_', ' ')
-        }
-        for var in variations:
-            if var and re.search(rf'\b{re.escape(var)}\b', text_lower):
-                found_skills.add(skill)
-                break
-
-    return list(found_skills)
+    return list(get_skill_matcher(skills_list).find(doc.text_lower))
 
 def extract_institution(line):
     line = re.sub(r'\b(bachelor|master|degree|diploma|b\.?sc|m\.?sc|ph\.?d)\b', '', line.lower())
@@ -112,39 +354,31 @@ def extract_institution(line):
     words = [w for w in line.split() if len(w) > 2]
     return ' '.join(words[:3]).title() if words else ''
 
+@metrics.timed('extract_education')
 def extract_education(text):
-    if not text:
+    doc = parse_document(text)
+    if not doc.text:
         return "Not Found"
 
-    degree_patterns = [
-        r'(bachelor(?:s)?(?: of (?:science|arts|engineering|business))?(?: in [\w\s]+)?)',
-        r'(master(?:s)?(?: of (?:science|arts|engineering|business))?(?: in [\w\s]+)?)',
-        r'(b\.?(?:sc|tech|eng|com|a)\.? in [\w\s]+)',
-        r'(m\.?(:?sc|tech|eng|com|a|ba)\.? in [\w\s]+)',
-        r'(ph\.?d\.? in [\w\s]+)',
-        r'(doctorate in [\w\s]+)',
-        r'(associate(?: degree)? in [\w\s]+)',
-        r'(diploma in [\w\s]+)'
-    ]
-
-    education_info = []
-    for line in text.split('\n'):
-        for pattern in degree_patterns:
-            match = re.search(pattern, line.lower())
-            if match:
-                year = re.search(r'\b(19|20)\d{2}\b', line)
-                institution = extract_institution(line)
-                education_info.append({
-                    'degree': match.group(1).title(),
-                    'year': year.group() if year else '',
-                    'institution': institution,
-                    'full_line': line.strip()
-                })
-
-    if education_info:
-        best = max(education_info, key=lambda x: len(x['full_line']))
-        return f"{best['degree']}, {best['institution']} ({best['year']})".strip(', ()')
-    return "Not Found"
+    # The longest matching line wins (first one on ties), so only that line needs
+    # its degree, year and institution worked out.
+    best_line, best_len = None, -1
+    for line, line_lower in zip(doc.lines, doc.lower_lines):
+        if not any(hint in line_lower for hint in DEGREE_HINTS):
+            continue
+        if ANY_DEGREE_RE.search(line_lower):
+            length = len(line.strip())
+            if length > best_len:
+                best_line, best_len = line, length
+
+    if best_line is None:
+        return "Not Found"
+    line_lower = best_line.lower()
+    match = next(m for m in (pattern.search(line_lower) for pattern in DEGREE_RES) if m)
+    year = YEAR_RE.search(best_line)
+    degree = match.group(1).title()
+    institution = extract_institution(best_line)
+    return f"{degree}, {institution} ({year.group() if year else ''})".strip(', ()')
 
 def parse_date(date_str):
     if not date_str:
@@ -154,20 +388,14 @@ def parse_date(date_str):
         return datetime.now()
 
     try:
-        if re.match(r'\d{1,2}/\d{4}', date_str):
+        if MONTH_YEAR_DATE_RE.match(date_str):
             month, year = map(int, date_str.split('/'))
             return datetime(year, month, 1)
-        if re.match(r'\d{4}', date_str):
+        if YEAR_DATE_RE.match(date_str):
             return datetime(int(date_str), 1, 1)
 
-        month_map = {m.lower(): i for i, m in enumerate(month_abbr) if m}
-        month_map.update({
-            'january': 1, 'february': 2, 'march': 3, 'april': 4,
-            'may': 5, 'june': 6, 'july': 7, 'august': 8,
-            'september': 9, 'october': 10, 'november': 11, 'december': 12
-        })
-        year = re.search(r'\b(19|20)\d{2}\b', date_str)
-        for name, num in month_map.items():
+        year = YEAR_RE.search(date_str)
+        for name, num in MONTH_MAP.items():
             if name in date_str:
                 return datetime(int(year.group()), num, 1)
     except:
@@ -190,37 +418,22 @@ def calculate_non_overlapping_experience(ranges):
     return total
 
 def extract_experience_section(text):
-    if not text:
+    doc = parse_document(text)
+    if not doc.text:
         return ""
-    lines = text.split('\n')
-    start, end = -1, len(lines)
-    for i, line in enumerate(lines):
-        if re.search(r'\b(experience|employment|work history|professional experience)\b', line.lower()):
-            start = i
-            break
-    if start == -1:
-        return text
-    for i in range(start + 1, len(lines)):
-        if re.search(r'\b(education|skills|projects|certifications)\b', lines[i].lower()):
-            end = i
-            break
-    return '\n'.join(lines[start:end])
+    return doc.experience_section
 
+@metrics.timed('extract_experience_years')
 def extract_experience_years(text):
-    if not text:
+    doc = parse_document(text)
+    if not doc.text:
         return 0.0
 
-    patterns = [
-        r'((?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w* \d{4})\s*[-\u2013to]+\s*((?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)\w* \d{4}|present|current)',
-        r'(\d{1,2}/\d{4})\s*[-\u2013to]+\s*(\d{1,2}/\d{4}|present|current)',
-        r'(\d{4})\s*[-\u2013to]+\s*(\d{4}|present|current)'
-    ]
-
-    exp_text = extract_experience_section(text)
+    exp_text = doc.experience_section_lower
     matches = []
 
-    for pattern in patterns:
-        for start, end in re.findall(pattern, exp_text.lower()):
+    for pattern in DATE_RANGE_RES:
+        for start, end in pattern.findall(exp_text):
             s_date = parse_date(start)
             e_date = parse_date(end) if end not in ['present', 'current'] else datetime.now()
             if s_date and e_date and e_date > s_date:
@@ -231,12 +444,13 @@ def extract_experience_years(text):
 
 def debug_extraction(text, skills_list=None):
     logging.info("=== DEBUG EXTRACTION ===")
-    if text:
-        logging.info(f"Text length: {len(text)}")
-        logging.info(f"Basic Info: {extract_basic_info(text)}")
-        logging.info(f"Education: {extract_education(text)}")
-        logging.info(f"Experience: {extract_experience_years(text)} years")
+    doc = parse_document(text)
+    if doc.text:
+        logging.info(f"Text length: {len(doc.text)}")
+        logging.info(f"Basic Info: {extract_basic_info(doc)}")
+        logging.info(f"Education: {extract_education(doc)}")
+        logging.info(f"Experience: {extract_experience_years(doc)} years")
         if skills_list:
-            skills = extract_skills(text, skills_list)
+            skills = extract_skills(doc, skills_list)
             logging.info(f"Skills found: {len(skills)} - {skills[:10]}")
     logging.info("=== END DEBUG ===")
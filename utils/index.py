@@ -0,0 +1,329 @@
+# utils/index.py
+import os
+import json
+import random
+import logging
+import numpy as np
+from numpy.lib.format import open_memmap
+from utils import pipeline, scoring
+from utils.skill_index import SkillIndex, SKILL_INDEX_FILE
+from utils.routing import CategoryRouter, CENTROIDS_FILE
+
+EMBEDDINGS_FILE = 'embeddings.npy'
+METADATA_FILE = 'metadata.json'
+METADATA_COLUMNS = ('path', 'category', 'name', 'email', 'skills', 'years_exp')
+
+def iter_corpus(data_dir):
+    """
+    Yield (path, category) for every resume under data_dir/<CATEGORY>/, in a stable order.
+    """
+    for category in sorted(os.listdir(data_dir)):
+        category_dir = os.path.join(data_dir, category)
+        if not os.path.isdir(category_dir):
+            continue
+        for name in sorted(os.listdir(category_dir)):
+            if name.endswith(pipeline.SUPPORTED_EXTENSIONS):
+                yield os.path.join(category_dir, name), category
+
+def _index_corpus(corpus, staging, metadata, skill_index, st_model, skills_list, cache,
+                  batch_size, chunk_size, max_workers, timeout):
+    """
+    Parse and embed corpus into the staging rows after those already in
+    metadata, appending to metadata and skill_index as it goes. Returns the
+    scoring texts of the resumes indexed.
+    """
+    rows = len(metadata['path'])
+    corpus_texts = []
+    for start in range(0, len(corpus), chunk_size):
+        chunk = corpus[start:start + chunk_size]
+        uploads = []
+        for path, _ in chunk:
+            with open(path, 'rb') as f:
+                uploads.append((path, f.read()))
+        parsed = pipeline.parse_resumes(uploads, skills_list, cache=cache,
+                                        max_workers=max_workers, timeout=timeout)
+
+        texts = []
+        for (path, category), (_, record, error) in zip(chunk, parsed):
+            if record is None:
+                logging.warning(f"Skipping {path}: {error}")
+                continue
+            texts.append(pipeline.scoring_text(record))
+            metadata['path'].append(path)
+            metadata['category'].append(category)
+            metadata['name'].append(record['info']['name'])
+            metadata['email'].append(record['info']['email'])
+            metadata['skills'].append(record['skills'])
+            metadata['years_exp'].append(record['years_exp'])
+            skill_index.add(path, record['skills'], category)
+        if texts:
+            staging[rows:rows + len(texts)] = scoring.encode_texts(texts, st_model, batch_size)
+            rows += len(texts)
+            corpus_texts.extend(texts)
+        logging.info(f"Indexed {start + len(chunk)}/{len(corpus)} resumes")
+    return corpus_texts
+
+def _save_index(index_dir, staging, rows, metadata, skill_index, st_model):
+    final_tmp = os.path.join(index_dir, EMBEDDINGS_FILE + '.new')
+    with open(final_tmp, 'wb') as f:
+        np.save(f, staging[:rows])
+    os.replace(final_tmp, os.path.join(index_dir, EMBEDDINGS_FILE))
+    metadata['model'], metadata['backend'] = scoring.model_spec(st_model) or (None, None)
+    with open(os.path.join(index_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, separators=(',', ':'))
+    skill_index.save(os.path.join(index_dir, SKILL_INDEX_FILE))
+
+def build_index(data_dir, index_dir, st_model, skills_list, cache=None,
+                batch_size=32, chunk_size=256, max_workers=None, timeout=None, centroid_terms=2000):
+    """
+    Extract every resume under data_dir once and write its embedding to a
+    memory-mapped .npy file, a columnar metadata table, an inverted skill
+    index (row ids match) and per-category routing centroids in index_dir.
+    The metadata records the model and backend the embeddings came from.
+    Returns the number of indexed resumes.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    corpus = list(iter_corpus(data_dir))
+    dim = st_model.get_sentence_embedding_dimension()
+    tmp_path = os.path.join(index_dir, EMBEDDINGS_FILE + '.tmp')
+    staging = open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(max(len(corpus), 1), dim))
+    metadata = {column: [] for column in METADATA_COLUMNS}
+    skill_index = SkillIndex(skills_list)
+
+    try:
+        corpus_texts = _index_corpus(corpus, staging, metadata, skill_index, st_model, skills_list, cache,
+                                     batch_size, chunk_size, max_workers, timeout)
+        rows = len(metadata['path'])
+
+        centroids_path = os.path.join(index_dir, CENTROIDS_FILE)
+        if os.path.exists(centroids_path):
+            os.remove(centroids_path)
+        if rows:
+            try:
+                router = CategoryRouter.build(staging[:rows], metadata['category'], corpus_texts, centroid_terms)
+                router.save(centroids_path)
+            except ValueError as e:
+                # e.g. no term occurs in enough resumes; search still works without routing
+                logging.warning(f"Skipping category centroids: {e}")
+
+        _save_index(index_dir, staging, rows, metadata, skill_index, st_model)
+    finally:
+        del staging
+        os.remove(tmp_path)
+    return rows
+
+def update_index(data_dir, index_dir, st_model, skills_list, cache=None,
+                 batch_size=32, chunk_size=256, max_workers=None, timeout=None):
+    """
+    Index only the resumes under data_dir that index_dir does not have yet,
+    appending them after the existing rows. Existing rows, skill bitsets and
+    category centroids are kept as they are. Returns the number of resumes
+    added. Raises ValueError when the index needs a full rebuild instead:
+    another model, a skills list with new entries, or no skill index.
+    """
+    index = ResumeIndex(index_dir)
+    index.check_model(st_model)
+    skill_index = index.skill_index
+    if skill_index is None:
+        raise ValueError('this index has no skill index; rebuild it')
+    new_skills = set(skills_list) - set(skill_index.skills)
+    if new_skills:
+        raise ValueError(f'{len(new_skills)} skill(s) are not in the index, e.g. {sorted(new_skills)[0]!r}; rebuild it')
+
+    known = {os.path.normpath(path) for path in index.metadata['path']}
+    corpus = [(path, category) for path, category in iter_corpus(data_dir) if os.path.normpath(path) not in known]
+    if not corpus:
+        return 0
+    existing = len(index)
+    metadata = {column: list(index.metadata[column]) for column in METADATA_COLUMNS}
+    tmp_path = os.path.join(index_dir, EMBEDDINGS_FILE + '.tmp')
+    staging = open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                          shape=(existing + len(corpus), st_model.get_sentence_embedding_dimension()))
+    try:
+        staging[:existing] = index.embeddings
+        del index
+        _index_corpus(corpus, staging, metadata, skill_index, st_model, skills_list, cache,
+                      batch_size, chunk_size, max_workers, timeout)
+        rows = len(metadata['path'])
+        _save_index(index_dir, staging, rows, metadata, skill_index, st_model)
+    finally:
+        del staging
+        os.remove(tmp_path)
+    return rows - existing
+
+def load_tfidf_reference(path):
+    """
+    The scoring.TfidfReference saved at path, or None (logged as an error)
+    when it has not been built. Never parses the corpus, so it is safe to
+    call from a server.
+    """
+    if not os.path.exists(path):
+        logging.error(f"No TF-IDF reference at {path}; build it with `python -m utils.index --tfidf-reference`. "
+                      f"Until then TF-IDF is fitted per batch and chunked scores depend on their chunk")
+        return None
+    return scoring.TfidfReference.load(path)
+
+def tfidf_reference(path, data_dir, skills_list, sample=300, seed=0, cache=None, max_workers=None, timeout=None):
+    """
+    The scoring.TfidfReference saved at path, fitted first on a seeded sample
+    of the data_dir corpus if the file does not exist yet. Returns None when
+    there is no corpus to fit on.
+    """
+    if os.path.exists(path):
+        return scoring.TfidfReference.load(path)
+    corpus = [corpus_path for corpus_path, _ in iter_corpus(data_dir)] if os.path.isdir(data_dir) else []
+    random.Random(seed).shuffle(corpus)
+    uploads = []
+    for corpus_path in sorted(corpus[:sample]):
+        with open(corpus_path, 'rb') as f:
+            uploads.append((corpus_path, f.read()))
+    logging.info(f"Fitting the TF-IDF reference on {len(uploads)} resumes from {data_dir}")
+    parsed = pipeline.parse_resumes(uploads, skills_list, cache=cache, max_workers=max_workers, timeout=timeout)
+    texts = [pipeline.scoring_text(record) for _, record, _ in parsed if record is not None]
+    if not texts:
+        logging.warning(f"No resumes under {data_dir} to fit a TF-IDF reference on")
+        return None
+    reference = scoring.fit_tfidf_vectorizer(texts, min_df=2 if len(texts) > 1 else 1)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    reference.save(path)
+    return reference
+
+class ResumeIndex:
+    """
+    Read-only view of an index written by build_index. Embeddings are opened
+    with mmap_mode='r', so worker processes share the OS page cache instead of
+    each holding its own copy. skill_index and router are None for indexes
+    built before they existed.
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.embeddings = np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r')
+        with open(os.path.join(index_dir, METADATA_FILE), 'r', encoding='utf-8') as f:
+            self.metadata = json.load(f)
+        skills_path = os.path.join(index_dir, SKILL_INDEX_FILE)
+        self.skill_index = SkillIndex.load(skills_path) if os.path.exists(skills_path) else None
+        centroids_path = os.path.join(index_dir, CENTROIDS_FILE)
+        self.router = CategoryRouter.load(centroids_path) if os.path.exists(centroids_path) else None
+        categories = np.array(self.metadata['category'])
+        self.partitions = {category: np.flatnonzero(categories == category) for category in sorted(set(categories))}
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    def row(self, i):
+        return {column: self.metadata[column][i] for column in METADATA_COLUMNS}
+
+    def search(self, query_embedding, k=10, rows=None):
+        """
+        Return the top-k (row, score) pairs for a normalised query embedding,
+        using one matrix-vector product and a partial sort. rows, a sorted
+        array of row ids, restricts the search to those resumes.
+        """
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        n = embeddings.shape[0]
+        if n == 0 or k <= 0:
+            return []
+        scores = embeddings @ np.asarray(query_embedding, dtype=np.float32)
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        ids = top if rows is None else rows[top]
+        return [(int(i), float(scores[j]) * 100) for i, j in zip(ids, top)]
+
+    def filter_rows(self, skill_query):
+        """
+        Row ids matching a boolean skill query (see SkillIndex.query).
+        """
+        if self.skill_index is None:
+            raise ValueError('this index has no skill index; rebuild it')
+        return self.skill_index.to_ids(self.skill_index.query(skill_query))
+
+    def check_model(self, st_model):
+        """
+        Raise ValueError if st_model is not the model and backend the index
+        was built with, as their embeddings are not comparable.
+        """
+        built = (self.metadata.get('model'), self.metadata.get('backend'))
+        spec = scoring.model_spec(st_model)
+        if built[0] is not None and spec is not None and spec != built:
+            raise ValueError(f'this index was built with {built[0]} ({built[1]}) but the model is '
+                             f'{spec[0]} ({spec[1]}); rebuild it')
+
+    def probe_rows(self, jd, st_model, n_probe):
+        """
+        Row ids of the resumes in the n_probe categories the router puts
+        nearest to the JD, and those categories.
+        """
+        if self.router is None:
+            raise ValueError('this index has no category centroids; rebuild it')
+        categories = self.router.route(jd, st_model, n_probe)
+        return np.concatenate([self.partitions[category] for category in categories]), categories
+
+    def search_text(self, jd, st_model, k=10, skill_query=None, n_probe=None):
+        """
+        Search with a JD's text or a scoring.JobDescription, reusing its
+        embedding. With n_probe, only the resumes of the JD's n_probe nearest
+        categories are scored.
+        """
+        self.check_model(st_model)
+        if not isinstance(jd, scoring.JobDescription):
+            jd = scoring.JobDescription(jd, [])
+        rows = self.filter_rows(skill_query) if skill_query else None
+        if n_probe:
+            probed, _ = self.probe_rows(jd, st_model, n_probe)
+            rows = np.sort(probed) if rows is None else np.intersect1d(rows, probed)
+        query = jd.embed(st_model)
+        results = []
+        for i, score in self.search(query, k, rows):
+            match = self.row(i)
+            match['score'] = round(score, 2)
+            results.append(match)
+        return results
+
+if __name__ == '__main__':
+    import argparse
+    import config
+    from utils import extractor
+    from utils.cache import extraction_cache_from_config
+
+    parser = argparse.ArgumentParser(description='Build the resume embedding index.')
+    parser.add_argument('--data', default=config.DATA_DIR, help='corpus root with one folder per category')
+    parser.add_argument('--out', default=config.INDEX_DIR, help='directory to write the index to')
+    parser.add_argument('--tfidf-reference', action='store_true',
+                        help=f'only fit the TF-IDF reference ({config.TFIDF_REFERENCE_PATH}) used for scoring')
+    parser.add_argument('--update', action='store_true',
+                        help='only add resumes the index in --out does not have yet')
+    args = parser.parse_args()
+
+    extractor.configure_pdf_from_config()
+    cache = extraction_cache_from_config()
+    if args.tfidf_reference:
+        if os.path.exists(config.TFIDF_REFERENCE_PATH):
+            os.remove(config.TFIDF_REFERENCE_PATH)
+        tfidf_reference(config.TFIDF_REFERENCE_PATH, args.data, extractor.load_skills(config.SKILLS_FILE),
+                        sample=config.TFIDF_REFERENCE_SAMPLE, cache=cache,
+                        max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT)
+        raise SystemExit(0)
+    st_model = scoring.load_st_model(config.SENTENCE_TRANSFORMER_MODEL, backend=config.MODEL_BACKEND)
+    skills_list = extractor.load_skills(config.SKILLS_FILE)
+    if args.update:
+        try:
+            count = update_index(args.data, args.out, st_model, skills_list, cache=cache,
+                                 batch_size=config.EMBEDDING_BATCH_SIZE,
+                                 max_workers=config.PARSE_WORKERS, timeout=config.PARSE_TIMEOUT)
+        except ValueError as e:
+            parser.error(str(e))
+        logging.info(f"Added {count} resumes to {args.out}")
+        raise SystemExit(0)
+    count = build_index(
+        args.data, args.out, st_model, skills_list,
+        cache=cache,
+        batch_size=config.EMBEDDING_BATCH_SIZE,
+        max_workers=config.PARSE_WORKERS,
+        timeout=config.PARSE_TIMEOUT,
+        centroid_terms=config.CENTROID_TERMS
+    )
+    logging.info(f"Wrote {count} resumes to {args.out}")
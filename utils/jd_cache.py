@@ -0,0 +1,173 @@
+# utils/jd_cache.py
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+from utils import extractor, scoring, metrics
+
+JD_CACHE_SCHEMA_VERSION = 4
+
+def normalize_jd(jd_text):
+    """
+    JD text lowercased, with CRLF/CR line endings and trailing whitespace
+    removed. Skill matching and cleaning already ignore these differences.
+    """
+    return '\n'.join(line.rstrip() for line in jd_text.lower().splitlines()).strip()
+
+def jd_key(jd_text):
+    """
+    Cache key for a job description: the SHA-256 of its normalized text, which
+    skills are extracted from.
+    """
+    return hashlib.sha256(normalize_jd(jd_text).encode('utf-8')).hexdigest()
+
+def prepare_jd(jd_text, skills_list, st_model=None):
+    """
+    Build a scoring.JobDescription from raw JD text, embedding it when a model is given.
+    Skills are matched on the normalized text jd_key is built from.
+    """
+    text = normalize_jd(jd_text)
+    jd = scoring.JobDescription(extractor.clean_text(text), extractor.extract_skills(text, skills_list))
+    if st_model is not None:
+        jd.embed(st_model)
+    return jd
+
+class JDCache:
+    """
+    LRU cache of precomputed job descriptions keyed by jd_key, so a JD pasted
+    again (or scored by another request) is not cleaned, skill-matched,
+    vectorised or embedded a second time. Entries expire ttl seconds after they
+    were computed. With a path, entries are also written to SQLite and survive
+    restarts; the disk tier is tagged with the skills list. Embeddings carry
+    the model name and backend that produced them and are recomputed when a
+    different model, backend or model server asks for them.
+    """
+
+    def __init__(self, skills_list, capacity=256, ttl=None, path=None):
+        self.skills_list = skills_list
+        self.capacity = capacity
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        digest = hashlib.sha256(f'{JD_CACHE_SCHEMA_VERSION}:'.encode())
+        digest.update('\n'.join(skills_list).encode('utf-8'))
+        self.version = digest.hexdigest()[:16]
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS jds ('
+                    ' key TEXT PRIMARY KEY,'
+                    ' version TEXT NOT NULL,'
+                    ' payload BLOB NOT NULL,'
+                    ' embedding BLOB,'
+                    ' created REAL NOT NULL)'
+                )
+                conn.execute('DELETE FROM jds WHERE version != ?', (self.version,))
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, jd_text, st_model=None):
+        """
+        The JobDescription for jd_text, from memory, disk or freshly computed.
+        With st_model, its embedding is computed too if the entry lacks one
+        from that model and backend.
+        """
+        key = jd_key(jd_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry[0]):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        result = 'hit'
+        if entry is None and self.path:
+            entry = self._load(key)
+            result = 'disk'
+        if entry is None:
+            entry = (time.time(), prepare_jd(jd_text, self.skills_list))
+            result = 'miss'
+
+        created, jd = entry
+        embedded = st_model is not None and not jd.embedded_by(st_model)
+        if embedded:
+            jd.embed(st_model)
+        if self.path and (result == 'miss' or embedded):
+            self._store(key, created, jd)
+
+        with self._lock:
+            if result == 'hit':
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._entries[key] = entry
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+        metrics.increment('jd_cache_total', result=result)
+        return jd
+
+    def stats(self):
+        return {'entries': len(self._entries), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses}
+
+    def _load(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    'SELECT payload, embedding, created FROM jds WHERE key = ? AND version = ?',
+                    (key, self.version)
+                ).fetchone()
+                if row is not None and self._expired(row[2]):
+                    conn.execute('DELETE FROM jds WHERE key = ?', (key,))
+                    row = None
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+            embedding = np.frombuffer(row[1], dtype=np.float32).copy() if row[1] is not None else None
+            return row[2], scoring.JobDescription(payload['cleaned'], payload['skills'], payload['ngrams'], embedding,
+                                                  payload.get('model'))
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            logging.error(f"JD cache read error: {e}")
+            return None
+
+    def _store(self, key, created, jd):
+        payload = json.dumps({'cleaned': jd.cleaned, 'skills': jd.skills, 'ngrams': jd.ngrams,
+                              'model': jd.embedding_model},
+                             separators=(',', ':')).encode('utf-8')
+        embedding = np.asarray(jd.embedding, dtype=np.float32).tobytes() if jd.embedding is not None else None
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO jds (key, version, payload, embedding, created) VALUES (?, ?, ?, ?, ?)',
+                    (key, self.version, payload, embedding, created)
+                )
+                if self.ttl is not None:
+                    conn.execute('DELETE FROM jds WHERE created < ?', (time.time() - self.ttl,))
+        except sqlite3.Error as e:
+            logging.error(f"JD cache write error: {e}")
@@ -0,0 +1,282 @@
+# utils/jobs.py
+import os
+import json
+import time
+import queue
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+class JobStore:
+    """
+    SQLite-backed record of background jobs: their uploads, progress, warnings
+    and partial results. Uploads are deleted once a job finishes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' status TEXT NOT NULL,'
+                ' jd_text TEXT NOT NULL,'
+                ' total INTEGER NOT NULL,'
+                ' done INTEGER NOT NULL DEFAULT 0,'
+                ' warnings TEXT NOT NULL DEFAULT \'[]\','
+                ' error TEXT,'
+                ' created REAL NOT NULL,'
+                ' updated REAL NOT NULL)'
+            )
+            columns = {name for _, name, *_ in conn.execute('PRAGMA table_info(jobs)')}
+            if 'owner' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            if 'attempts' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_files ('
+                ' job_id TEXT NOT NULL, seq INTEGER NOT NULL, filename TEXT NOT NULL, data BLOB NOT NULL,'
+                ' PRIMARY KEY (job_id, seq))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS job_results ('
+                ' job_id TEXT NOT NULL, seq INTEGER NOT NULL, score REAL NOT NULL, payload TEXT NOT NULL,'
+                ' PRIMARY KEY (job_id, seq))'
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def create(self, jd_text, uploads, warnings=()):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO jobs (id, status, jd_text, total, warnings, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, 'queued', jd_text, len(uploads), json.dumps(list(warnings)), now, now)
+            )
+            conn.executemany(
+                'INSERT INTO job_files (job_id, seq, filename, data) VALUES (?, ?, ?, ?)',
+                [(job_id, i, filename, data) for i, (filename, data) in enumerate(uploads)]
+            )
+        return job_id
+
+    def load(self, job_id):
+        """
+        Return (jd_text, uploads) for a job, as stored at submission.
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT jd_text FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            files = conn.execute(
+                'SELECT filename, data FROM job_files WHERE job_id = ? ORDER BY seq', (job_id,)
+            ).fetchall()
+        return row[0], [(filename, bytes(data)) for filename, data in files]
+
+    def set_status(self, job_id, status, error=None):
+        with self._connect() as conn:
+            conn.execute('UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?',
+                         (status, error, time.time(), job_id))
+            if status in ('done', 'failed'):
+                conn.execute('DELETE FROM job_files WHERE job_id = ?', (job_id,))
+
+    def add_progress(self, job_id, rows, warnings, processed):
+        """
+        Append scored rows and warnings for a finished chunk and advance the done counter.
+        """
+        with self._connect() as conn:
+            start = conn.execute('SELECT COUNT(*) FROM job_results WHERE job_id = ?', (job_id,)).fetchone()[0]
+            conn.executemany(
+                'INSERT INTO job_results (job_id, seq, score, payload) VALUES (?, ?, ?, ?)',
+                [(job_id, start + i, row['score'], json.dumps(row)) for i, row in enumerate(rows)]
+            )
+            if warnings:
+                current = json.loads(conn.execute('SELECT warnings FROM jobs WHERE id = ?', (job_id,)).fetchone()[0])
+                conn.execute('UPDATE jobs SET warnings = ? WHERE id = ?', (json.dumps(current + list(warnings)), job_id))
+            conn.execute('UPDATE jobs SET done = done + ?, updated = ? WHERE id = ?', (processed, time.time(), job_id))
+
+    def get(self, job_id, limit=None, offset=0):
+        """
+        Return the job's status with its results so far, best first; None if
+        unknown. limit/offset select one page of results inside SQLite.
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT status, total, done, warnings, error, created, updated FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            results = conn.execute(
+                'SELECT payload FROM job_results WHERE job_id = ? ORDER BY score DESC, seq LIMIT ? OFFSET ?',
+                (job_id, -1 if limit is None else limit, offset)
+            ).fetchall()
+            scored = conn.execute('SELECT COUNT(*) FROM job_results WHERE job_id = ?', (job_id,)).fetchone()[0]
+        status, total, done, warnings, error, created, updated = row
+        return {
+            'id': job_id,
+            'status': status,
+            'total': total,
+            'done': done,
+            'warnings': json.loads(warnings),
+            'error': error,
+            'created': created,
+            'updated': updated,
+            'scored': scored,
+            'offset': offset,
+            'results': [json.loads(payload) for payload, in results]
+        }
+
+    def claim(self, job_id, owner):
+        """
+        Atomically move a queued job to running under owner; False if another
+        worker got it first.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, attempts = attempts + 1, updated = ?"
+                " WHERE id = ? AND status = 'queued'",
+                (owner, time.time(), job_id)
+            )
+            return cursor.rowcount == 1
+
+    def recover(self, is_orphaned, max_attempts):
+        """
+        Requeue running jobs whose owner is_orphaned(owner) says has died,
+        discarding their partial results; jobs already tried max_attempts
+        times are failed instead. Returns (requeued, failed) job ids.
+        """
+        requeued, failed = [], []
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner, attempts FROM jobs WHERE status = 'running'").fetchall()
+            for job_id, owner, attempts in rows:
+                if not is_orphaned(owner):
+                    continue
+                if attempts >= max_attempts:
+                    conn.execute("UPDATE jobs SET status = 'failed', error = ?, updated = ? WHERE id = ?",
+                                 ('interrupted by a restart', time.time(), job_id))
+                    conn.execute('DELETE FROM job_files WHERE job_id = ?', (job_id,))
+                    failed.append(job_id)
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', done = 0, owner = NULL, updated = ? WHERE id = ?",
+                                 (time.time(), job_id))
+                    conn.execute('DELETE FROM job_results WHERE job_id = ?', (job_id,))
+                    requeued.append(job_id)
+        return requeued, failed
+
+    def queued(self):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created").fetchall()
+        return [job_id for job_id, in rows]
+
+class JobQueue:
+    """
+    Bounded queue of job ids served by a fixed number of daemon threads. Each
+    worker calls handler(job_id, jd_text, uploads, store); submitting while the
+    queue is full raises QueueFull so callers can push back on the client.
+    Jobs left in the store by an earlier process are fed in as the queue drains.
+    """
+
+    def __init__(self, store, handler, workers=2, max_queue=16, max_attempts=2):
+        self.store = store
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        self.pending = set()
+        self.lock = threading.Lock()
+        requeued, failed = store.recover(self._is_orphaned, max_attempts)
+        if requeued or failed:
+            logging.warning(f"Recovered {len(requeued)} interrupted job(s); "
+                            f"failed {len(failed)} after {max_attempts} attempts")
+        # claim() keeps several processes sharing the store from running a job twice.
+        self._fill()
+        self.threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def _is_orphaned(self, owner):
+        """
+        True if the process that claimed a job is gone. Owners on other hosts
+        can't be checked and are left alone.
+        """
+        if not owner:
+            return True
+        host, pid, token = owner.rsplit(':', 2)
+        if host != socket.gethostname():
+            return False
+        if int(pid) == os.getpid():
+            return token != self.owner.rsplit(':', 1)[1]
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return True
+        except PermissionError:
+            pass
+        return False
+
+    def _fill(self):
+        """
+        Top the queue up with stored jobs that are queued but not yet in it.
+        """
+        with self.lock:
+            if self.queue.full():
+                return
+            for job_id in self.store.queued():
+                if job_id in self.pending:
+                    continue
+                try:
+                    self.queue.put_nowait(job_id)
+                except queue.Full:
+                    break
+                self.pending.add(job_id)
+
+    def submit(self, jd_text, uploads, warnings=()):
+        # Held across create so _fill() can't enqueue the new job first.
+        with self.lock:
+            if self.queue.full():
+                raise QueueFull()
+            job_id = self.store.create(jd_text, uploads, warnings)
+            try:
+                self.queue.put_nowait(job_id)
+            except queue.Full:
+                self.store.set_status(job_id, 'failed', 'queue full')
+                raise QueueFull()
+            self.pending.add(job_id)
+        return job_id
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def _work(self):
+        while True:
+            job_id = self.queue.get()
+            with self.lock:
+                self.pending.discard(job_id)
+            try:
+                if not self.store.claim(job_id, self.owner):
+                    continue
+                jd_text, uploads = self.store.load(job_id)
+                self.handler(job_id, jd_text, uploads, self.store)
+                self.store.set_status(job_id, 'done')
+            except Exception as e:
+                logging.exception(f"Job {job_id} failed")
+                self.store.set_status(job_id, 'failed', str(e))
+            finally:
+                self.queue.task_done()
+                self._fill()
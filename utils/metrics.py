@@ -0,0 +1,133 @@
+# utils/metrics.py
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, from sub-millisecond regex work up to slow PDFs.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_METRIC = 'resume_analyzer_stage_seconds'
+
+_enabled = False
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+def is_enabled():
+    return _enabled
+
+def observe(stage, seconds):
+    with _lock:
+        hist = _histograms.get(stage)
+        if hist is None:
+            hist = _histograms[stage] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist[0][i] += 1
+                break
+        hist[1] += seconds
+        hist[2] += 1
+
+def increment(name, amount=1, **labels):
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+@contextmanager
+def timer(stage):
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+def timed(stage):
+    """
+    Decorator recording the wrapped function's wall time under `stage`.
+    When metrics are disabled the only cost is one flag check per call.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def drain():
+    """
+    Return everything recorded so far and reset, so a worker process can ship
+    its observations back to the parent.
+    """
+    with _lock:
+        snapshot = {
+            'histograms': {stage: [list(h[0]), h[1], h[2]] for stage, h in _histograms.items()},
+            'counters': dict(_counters)
+        }
+        _histograms.clear()
+        _counters.clear()
+    return snapshot
+
+def merge(snapshot):
+    if not snapshot:
+        return
+    with _lock:
+        for stage, (buckets, total, count) in snapshot['histograms'].items():
+            hist = _histograms.get(stage)
+            if hist is None:
+                hist = _histograms[stage] = [[0] * len(BUCKETS), 0.0, 0]
+            hist[0] = [a + b for a, b in zip(hist[0], buckets)]
+            hist[1] += total
+            hist[2] += count
+        for key, value in snapshot['counters'].items():
+            _counters[key] = _counters.get(key, 0) + value
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+def render():
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    with _lock:
+        if _histograms:
+            lines.append(f'# HELP {STAGE_METRIC} Wall time spent in each extraction and scoring stage.')
+            lines.append(f'# TYPE {STAGE_METRIC} histogram')
+        for stage in sorted(_histograms):
+            buckets, total, count = _histograms[stage]
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {count}')
+        names = sorted({name for name, _ in _counters})
+        for name in names:
+            lines.append(f'# TYPE {name} counter')
+            for (key_name, labels), value in sorted(_counters.items()):
+                if key_name == name:
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
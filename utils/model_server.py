@@ -0,0 +1,284 @@
+# utils/model_server.py
+"""
+One process that owns the SentenceTransformer and encodes for every web
+worker over a Unix socket, so gunicorn workers do not each load torch and the
+model weights.
+
+    python -m utils.model_server
+
+Set config.MODEL_SERVER_SOCKET to the same path and the app talks to the
+server instead of loading the model itself. Messages are pickled, so both
+sides authenticate with a shared authkey and the socket lives in a directory
+only its owner can enter.
+"""
+import os
+import stat
+import time
+import queue
+import socket
+import secrets
+import logging
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+import numpy as np
+
+SOCKET_FILE = 'model.sock'
+AUTHKEY_FILE = 'authkey'
+
+def private_dir(path):
+    """
+    Create path with mode 0700 if needed and refuse one other users can reach into.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) & 0o077:
+        raise PermissionError(f"{path} must be owned by this user and not accessible to others (chmod 700)")
+    return path
+
+def load_authkey(directory, authkey=None):
+    """
+    The model server authkey as bytes: authkey when given (e.g. from the
+    MODEL_SERVER_AUTHKEY environment variable), otherwise the key in
+    directory/authkey, generated with mode 0600 on first use.
+    """
+    if authkey:
+        return authkey.encode('utf-8') if isinstance(authkey, str) else authkey
+    path = os.path.join(private_dir(directory), AUTHKEY_FILE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(path, 'rb') as f:
+            return f.read().strip()
+    key = secrets.token_hex(32).encode('ascii')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+class ModelServer:
+    """
+    Serves encode requests from any number of client connections. Requests
+    arriving within `window` seconds of each other are merged into one
+    model.encode call of up to max_batch texts, so concurrent small requests
+    from different workers run at full batch efficiency. Embeddings are
+    returned un-normalised; clients normalise as asked. The 'info' message
+    returns the model's (name, backend), so clients can tell whose embeddings
+    they get. Connections that fail the authkey challenge are dropped.
+    """
+
+    def __init__(self, model, socket_path, authkey, window=0.005, max_batch=128, batch_size=32):
+        self.model = model
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.window = window
+        self.max_batch = max_batch
+        self.batch_size = batch_size
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._queue = queue.Queue()
+        self._listener = None
+
+    def _batch_loop(self):
+        while True:
+            pending = [self._queue.get()]
+            count = len(pending[0][0])
+            deadline = time.monotonic() + self.window
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                count += len(item[0])
+
+            texts = [text for request_texts, _ in pending for text in request_texts]
+            try:
+                embeddings = np.asarray(self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True),
+                                        dtype=np.float32)
+                error = None
+            except Exception as e:
+                logging.error(f"Model server encode error: {e}")
+                embeddings, error = None, str(e)
+            self.batches += 1
+            self.texts += len(texts)
+
+            start = 0
+            for request_texts, slot in pending:
+                if error is None:
+                    slot['result'] = embeddings[start:start + len(request_texts)]
+                else:
+                    slot['error'] = error
+                start += len(request_texts)
+                slot['done'].set()
+
+    def _handle(self, conn):
+        try:
+            while True:
+                message = conn.recv()
+                if message[0] == 'encode':
+                    texts = list(message[1])
+                    self.requests += 1
+                    if not texts:
+                        conn.send(('ok', np.zeros((0, 0), dtype=np.float32)))
+                        continue
+                    slot = {'done': threading.Event()}
+                    self._queue.put((texts, slot))
+                    slot['done'].wait()
+                    conn.send(('error', slot['error']) if 'error' in slot else ('ok', slot['result']))
+                elif message[0] == 'info':
+                    conn.send(('ok', getattr(self.model, 'model_spec', None)))
+                elif message[0] == 'stats':
+                    conn.send(('ok', {'requests': self.requests, 'batches': self.batches, 'texts': self.texts}))
+                else:
+                    conn.send(('ok', None))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            # A socket file nobody answers on is left over from a crashed server
+            probe = socket.socket(socket.AF_UNIX)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"A model server is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        threading.Thread(target=self._batch_loop, name='model-batcher', daemon=True).start()
+        self._listener = Listener(self.socket_path, family='AF_UNIX', authkey=self.authkey)
+        os.chmod(self.socket_path, 0o600)
+        logging.info(f"Model server listening on {self.socket_path}")
+        try:
+            while True:
+                try:
+                    conn = self._listener.accept()
+                except (AuthenticationError, EOFError, ConnectionError) as e:
+                    logging.warning(f"Model server rejected a connection: {e!r}")
+                    continue
+                except OSError:
+                    break
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+class ModelClient:
+    """
+    Stand-in for a SentenceTransformer that encodes through a ModelServer. It
+    takes the encode() arguments the scoring code uses; each thread keeps its
+    own connection.
+    """
+
+    def __init__(self, socket_path, authkey, timeout=120):
+        self.socket_path = socket_path
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+        self._model_spec = None
+
+    @property
+    def model_spec(self):
+        """
+        (model name, backend) the server encodes with, asked once.
+        """
+        if self._model_spec is None:
+            spec = self._call('info')
+            self._model_spec = tuple(spec) if spec is not None else None
+        return self._model_spec
+
+    def _call(self, *message):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = Client(self.socket_path, family='AF_UNIX', authkey=self.authkey)
+            # A new connection may reach a restarted server with another model
+            self._model_spec = None
+        try:
+            conn.send(message)
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Model server did not answer within {self.timeout}s")
+            status, payload = conn.recv()
+        except Exception:
+            conn.close()
+            self._local.conn = None
+            raise
+        if status != 'ok':
+            raise RuntimeError(f"Model server error: {payload}")
+        return payload
+
+    def encode(self, sentences, batch_size=32, convert_to_tensor=False, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        embeddings = self._call('encode', [sentences] if single else list(sentences))
+        if normalize_embeddings and len(embeddings):
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if convert_to_tensor:
+            import torch
+            embeddings = torch.from_numpy(embeddings)
+        return embeddings[0] if single else embeddings
+
+    def ping(self):
+        try:
+            self._call('ping')
+            return True
+        except (OSError, EOFError, TimeoutError, RuntimeError, AuthenticationError):
+            return False
+
+    def stats(self):
+        return self._call('stats')
+
+class RemoteModel:
+    """
+    The scoring.BackgroundModel interface for a model served by a ModelServer:
+    ready() once the server answers, get() returns a ModelClient.
+    """
+
+    def __init__(self, socket_path, authkey, timeout=120):
+        self.model_name = socket_path
+        self.error = None
+        self.client = ModelClient(socket_path, authkey, timeout)
+
+    def ready(self):
+        return self.client.ping()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.client.ping():
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"No model server answering on {self.model_name}")
+            time.sleep(0.2)
+        return self.client
+
+if __name__ == '__main__':
+    import argparse
+    import config
+    from utils import scoring
+
+    parser = argparse.ArgumentParser(description='Serve sentence embeddings to app workers over a Unix socket.')
+    parser.add_argument('--socket', default=config.MODEL_SERVER_SOCKET or os.path.join(config.MODEL_SERVER_DIR, SOCKET_FILE))
+    parser.add_argument('--model', default=config.SENTENCE_TRANSFORMER_MODEL)
+    parser.add_argument('--backend', choices=scoring.MODEL_BACKENDS, default=config.MODEL_BACKEND)
+    parser.add_argument('--window', type=float, default=config.MODEL_SERVER_BATCH_WINDOW,
+                        help='seconds to wait for more requests to join a batch')
+    parser.add_argument('--max-batch', type=int, default=config.MODEL_SERVER_MAX_BATCH,
+                        help='most texts encoded in one call')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if os.path.dirname(os.path.abspath(args.socket)) == os.path.abspath(config.MODEL_SERVER_DIR):
+        private_dir(config.MODEL_SERVER_DIR)
+    authkey = load_authkey(config.MODEL_SERVER_DIR, config.MODEL_SERVER_AUTHKEY)
+    model = scoring.load_st_model(args.model, allow_download=config.MODEL_ALLOW_DOWNLOAD,
+                                 backend=args.backend)
+    model.encode(['warmup'], convert_to_numpy=True)
+    ModelServer(model, args.socket, authkey, window=args.window, max_batch=args.max_batch,
+                batch_size=config.EMBEDDING_BATCH_SIZE).serve_forever()
@@ -0,0 +1,319 @@
+# utils/pipeline.py
+import io
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from collections import deque
+from utils import extractor, scoring, metrics
+from utils.cache import file_digest
+from utils.jd_cache import prepare_jd
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx')
+
+_worker_skills = None
+
+def parse_resume(filename, data, skills_list):
+    """
+    Extract the text and JD-independent fields of one resume from its raw bytes.
+    Returns None when no text could be extracted.
+    """
+    if filename.endswith('.pdf'):
+        text = extractor.extract_text_from_pdf(io.BytesIO(data))
+    else:
+        text = extractor.extract_text_from_docx(io.BytesIO(data))
+    if not text or not text.strip():
+        return None
+
+    doc = extractor.parse_document(text)
+    return {
+        'text': text,
+        'info': extractor.extract_basic_info(doc),
+        'skills': extractor.extract_skills(doc, skills_list),
+        'education': extractor.extract_education(doc),
+        'years_exp': extractor.extract_experience_years(doc)
+    }
+
+def scoring_text(record):
+    """
+    Text a parsed resume is scored on: cleaned text plus its skills and education.
+    """
+    return extractor.clean_text(record['text']) + ' ' + ' '.join(record['skills']) + ' ' + record['education']
+
+def _init_worker(skills_list, metrics_enabled, pdf_options):
+    global _worker_skills
+    _worker_skills = skills_list
+    metrics.reset()
+    metrics.enable(metrics_enabled)
+    extractor.configure_pdf(**pdf_options)
+    extractor.get_skill_matcher(skills_list)
+
+def _parse_in_worker(filename, data):
+    # Observations made in the worker are shipped back with the record.
+    record = parse_resume(filename, data, _worker_skills)
+    return record, metrics.drain() if metrics.is_enabled() else None
+
+class _ParsePool:
+    """
+    A worker pool together with the settings it was started with, and whether
+    it has been terminated (its unfinished tasks will then never complete).
+    """
+
+    def __init__(self, key, skills_list):
+        self.key = key
+        self.skills_list = skills_list
+        self.terminated = False
+        self.pool = _pool_context().Pool(key[0], initializer=_init_worker,
+                                         initargs=(skills_list, metrics.is_enabled(), extractor.pdf_options()))
+
+    def submit(self, filename, data):
+        return self.pool.apply_async(_parse_in_worker, (filename, data))
+
+    def terminate(self):
+        self.terminated = True
+        self.pool.terminate()
+
+_shared_pool = None
+_pool_lock = threading.Lock()
+_POLL_SECONDS = 0.5
+
+def _pool_context():
+    # Never fork: the app runs model-loader, job and request threads, and a
+    # lock any of them holds (logging, metrics, sqlite) would be copied locked.
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('spawn')
+    context = multiprocessing.get_context('forkserver')
+    context.set_forkserver_preload(['utils.pipeline'])
+    return context
+
+def shared_pool(processes, skills_list):
+    """
+    The long-lived extraction pool, started on first use and shared by every
+    caller in the process. It is replaced only when the worker count, skills
+    list or extraction settings change, or a worker gets stuck on a file.
+    """
+    global _shared_pool
+    key = (processes, tuple(skills_list), metrics.is_enabled(), tuple(sorted(extractor.pdf_options().items())))
+    with _pool_lock:
+        if _shared_pool is None or _shared_pool.key != key:
+            if _shared_pool is not None:
+                # Lets callers still waiting on it finish their files
+                _shared_pool.pool.close()
+            _shared_pool = _ParsePool(key, skills_list)
+        return _shared_pool
+
+def _replace_stuck_pool(stuck):
+    """
+    Terminate a pool whose worker is stuck on a file, starting a fresh shared
+    pool if it was the shared one.
+    """
+    global _shared_pool
+    with _pool_lock:
+        if not stuck.terminated:
+            stuck.terminate()
+        if _shared_pool is stuck:
+            _shared_pool = _ParsePool(stuck.key, stuck.skills_list)
+        return _shared_pool
+
+def default_workers():
+    return os.cpu_count() or 1
+
+def iter_parse_resumes(uploads, skills_list, cache=None, max_workers=None, timeout=None, window=None):
+    """
+    Stream (filename, record, error) tuples for an iterable of (filename, bytes)
+    uploads, in input order. error is None on success, 'timeout' when a file
+    exceeded the per-file timeout and 'no_text' when nothing could be extracted.
+    Cache misses are parsed in the shared pool (see shared_pool), and at most
+    `window` uploads are held in memory at once, so arbitrarily large corpora
+    stream through.
+    """
+    processes = max_workers or default_workers()
+    window = window or processes * 4
+    inline = processes <= 1 and timeout is None
+    inflight = deque()
+
+    def submit(filename, data):
+        digest = file_digest(data)
+        record = cache.get(digest) if cache is not None else None
+        pool = handle = None
+        if record is None and not inline:
+            pool = shared_pool(processes, skills_list)
+            handle = pool.submit(filename, data)
+        return [filename, data, digest, record, handle, pool]
+
+    def resubmit(entry):
+        entry[5] = shared_pool(processes, skills_list)
+        entry[4] = entry[5].submit(entry[0], entry[1])
+
+    def wait(entry):
+        # Poll so a file whose pool another caller terminated is resubmitted
+        # rather than reported as a timeout; it gets a full timeout again.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            handle, pool = entry[4], entry[5]
+            if pool.terminated and not handle.ready():
+                resubmit(entry)
+                deadline = None if timeout is None else time.monotonic() + timeout
+                continue
+            remaining = _POLL_SECONDS if deadline is None else min(_POLL_SECONDS, deadline - time.monotonic())
+            if remaining > 0:
+                handle.wait(remaining)
+            if handle.ready():
+                return handle.get()
+            if deadline is not None and time.monotonic() >= deadline:
+                raise multiprocessing.TimeoutError()
+
+    def finish(entry):
+        filename, data, digest, record, handle, pool = entry
+        if record is not None:
+            metrics.increment('resume_files_processed_total', source='cache')
+            return filename, record, None
+        if handle is None:
+            record = parse_resume(filename, data, skills_list)
+        else:
+            try:
+                record, observed = wait(entry)
+                metrics.merge(observed)
+            except multiprocessing.TimeoutError:
+                logging.error(f"Extraction timed out after {timeout}s: {filename}")
+                metrics.increment('resume_files_failed_total', reason='timeout')
+                # The stuck worker cannot be interrupted; replace the whole pool
+                # and resubmit whatever else was still in flight.
+                _replace_stuck_pool(entry[5])
+                for other in inflight:
+                    if other[5] is not None and other[5].terminated and not other[4].ready():
+                        resubmit(other)
+                return filename, None, 'timeout'
+            except Exception as e:
+                logging.error(f"Extraction failed for {filename}: {e}")
+                record = None
+        if record is None:
+            metrics.increment('resume_files_failed_total', reason='no_text')
+            return filename, None, 'no_text'
+        metrics.increment('resume_files_processed_total', source='parsed')
+        if cache is not None:
+            cache.put(digest, record)
+        return filename, record, None
+
+    for filename, data in uploads:
+        inflight.append(submit(filename, data))
+        if len(inflight) >= window:
+            yield finish(inflight.popleft())
+    while inflight:
+        yield finish(inflight.popleft())
+
+def parse_resumes(uploads, skills_list, cache=None, max_workers=None, timeout=None):
+    """
+    Parse a list of (filename, bytes) uploads in the shared pool and return
+    the (filename, record, error) tuples in upload order.
+    """
+    return list(iter_parse_resumes(uploads, skills_list, cache=cache, max_workers=max_workers,
+                                   timeout=timeout, window=max(len(uploads), 1)))
+
+def score_parsed(parsed, jd, skills_list, st_model, chunk_size=None, batch_size=32,
+                 cascade_top_n=None, cascade_threshold=None, dedup=None, tfidf_reference=None):
+    """
+    Score a stream of (filename, record, error) tuples against one job
+    description, yielding one list of (filename, record, error, score, stage,
+    duplicate_of) tuples per chunk as soon as it is scored; failed files pass
+    through with score and stage None. With chunk_size=None everything is
+    scored as a single batch.
+
+    TF-IDF uses tfidf_reference (a scoring.TfidfReference) when given, so
+    scores do not depend on the batch or chunk a resume lands in. Without one,
+    a single batch fits its own IDF, and chunked scoring fits it on the JD plus
+    the first chunk; later chunks reuse it. The cascade limits go into one
+    scoring.CascadeCutoff for the whole run, so the top_n is global rather
+    than per chunk; until top_n resumes have been seen, all of them reach
+    stage two, which is logged as a warning when top_n >= chunk_size.
+
+    With a DuplicateDetector as dedup, only the first resume of each
+    near-duplicate cluster is scored; later members take its score and stage,
+    and duplicate_of names the file they copied it from.
+
+    jd is the JD text or a scoring.JobDescription, e.g. from a JDCache; raw
+    text is prepared here and not cached.
+    """
+    if not isinstance(jd, scoring.JobDescription):
+        jd = prepare_jd(jd, skills_list)
+    vectorizer = tfidf_reference
+    cutoff = scoring.CascadeCutoff(cascade_top_n, cascade_threshold)
+    if chunk_size and cascade_top_n is not None and cascade_top_n >= chunk_size:
+        logging.warning(f"cascade_top_n={cascade_top_n} >= chunk_size={chunk_size}: "
+                        f"the first {cascade_top_n} resumes all reach stage two")
+    representatives = {}
+    chunk = []
+
+    def flush():
+        nonlocal vectorizer
+        entries = []
+        for seq, (filename, record, error) in chunk:
+            representative = seq
+            if dedup is not None and record is not None:
+                representative = dedup.add(seq, record['text'])
+            entries.append((seq, filename, record, error, representative))
+        scored = [(seq, filename, record) for seq, filename, record, _, representative in entries
+                  if record is not None and representative == seq]
+        texts = [scoring_text(record) for _, _, record in scored]
+        if chunk_size and texts and vectorizer is None:
+            vectorizer = scoring.fit_tfidf_vectorizer([jd.ngrams] + texts)
+        scores = scoring.cascade_scores_tfidf_st(
+            texts, jd, [record['skills'] for _, _, record in scored], jd.skills, st_model,
+            batch_size=batch_size, vectorizer=vectorizer, cutoff=cutoff
+        ) if texts else []
+        for (seq, filename, _), (score, stage) in zip(scored, scores):
+            representatives[seq] = (filename, score, stage)
+
+        results = []
+        for seq, filename, record, error, representative in entries:
+            if record is None:
+                results.append((filename, record, error, None, None, None))
+            elif representative == seq:
+                results.append((filename, record, error) + representatives[seq][1:] + (None,))
+            else:
+                original, score, stage = representatives[representative]
+                results.append((filename, record, error, score, stage, original))
+        return results
+
+    for seq, item in enumerate(parsed):
+        chunk.append((seq, item))
+        if chunk_size and len(chunk) >= chunk_size:
+            yield flush()
+            chunk = []
+    if chunk:
+        yield flush()
+
+def score_matrix(parsed, jds, skills_list, st_model, batch_size=32):
+    """
+    Score (filename, record, error) tuples against several job descriptions at
+    once; jds are texts or scoring.JobDescriptions. Returns the (filename,
+    record) pairs that had text, in order, and their N x M hybrid score matrix.
+    """
+    jds = [jd if isinstance(jd, scoring.JobDescription) else prepare_jd(jd, skills_list) for jd in jds]
+    scored = [(filename, record) for filename, record, _ in parsed if record is not None]
+    matrix = scoring.hybrid_score_matrix(
+        [scoring_text(record) for _, record in scored],
+        jds,
+        [record['skills'] for _, record in scored],
+        [jd.skills for jd in jds],
+        st_model, batch_size=batch_size
+    )
+    return scored, matrix
+
+def result_row(filename, record, score, stage='semantic', duplicate_of=None):
+    """
+    Flatten a scored resume into the row shown in the results table.
+    """
+    return {
+        'filename': filename,
+        'name': record['info']['name'],
+        'email': record['info']['email'],
+        'phone': record['info']['phone'],
+        'education': record['education'],
+        'years_exp': record['years_exp'],
+        'skills': ', '.join(record['skills']),
+        'score': score,
+        'stage': stage,
+        'duplicate_of': duplicate_of
+    }
@@ -0,0 +1,93 @@
+# utils/results.py
+import sys
+import heapq
+from array import array
+
+STAGES = ('semantic', 'filter')
+
+class ResultStore:
+    """
+    Column-oriented store for scored resumes. Scores and years of experience
+    are array('d') columns, skills are interned ids in one flat array('H') with
+    per-row offsets, and repeated strings are interned, so a row costs a few
+    dozen bytes plus its distinct text instead of a dict per resume. Ranked
+    access picks rows with a heap, so showing the top k or one page of
+    results never sorts or materialises the whole run.
+    """
+
+    def __init__(self):
+        self.filenames = []
+        self.names = []
+        self.emails = []
+        self.phones = []
+        self.educations = []
+        self.scores = array('d')
+        self.years = array('d')
+        self.stages = array('b')
+        self.skill_ids = array('H')
+        self.skill_offsets = array('L', [0])
+        self.skill_names = []
+        self._skill_lookup = {}
+        self.duplicates = {}
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _skill_id(self, skill):
+        skill_id = self._skill_lookup.get(skill)
+        if skill_id is None:
+            skill_id = self._skill_lookup[skill] = len(self.skill_names)
+            self.skill_names.append(skill)
+        return skill_id
+
+    def append(self, filename, record, score, stage='semantic', duplicate_of=None):
+        info = record['info']
+        self.filenames.append(filename)
+        self.names.append(sys.intern(info['name']))
+        self.emails.append(info['email'])
+        self.phones.append(info['phone'])
+        self.educations.append(sys.intern(record['education']))
+        self.scores.append(score)
+        self.years.append(record['years_exp'])
+        self.stages.append(STAGES.index(stage))
+        self.skill_ids.extend(self._skill_id(skill) for skill in record['skills'])
+        self.skill_offsets.append(len(self.skill_ids))
+        if duplicate_of is not None:
+            self.duplicates[len(self.scores) - 1] = duplicate_of
+
+    def skills(self, i):
+        return [self.skill_names[skill_id] for skill_id in self.skill_ids[self.skill_offsets[i]:self.skill_offsets[i + 1]]]
+
+    def row(self, i):
+        """
+        The same dict pipeline.result_row builds, for one stored resume.
+        """
+        return {
+            'filename': self.filenames[i],
+            'name': self.names[i],
+            'email': self.emails[i],
+            'phone': self.phones[i],
+            'education': self.educations[i],
+            'years_exp': self.years[i],
+            'skills': ', '.join(self.skills(i)),
+            'score': self.scores[i],
+            'stage': STAGES[self.stages[i]],
+            'duplicate_of': self.duplicates.get(i)
+        }
+
+    def top(self, k):
+        """
+        Row numbers of the k best scores, best first; ties keep insertion order.
+        """
+        return heapq.nlargest(k, range(len(self.scores)), key=self.scores.__getitem__)
+
+    def page(self, number, size):
+        """
+        Rows for 1-based page `number` of the ranking. Only the first
+        number * size row numbers are selected; the rest are never touched.
+        """
+        start = (max(number, 1) - 1) * size
+        return [self.row(i) for i in self.top(start + size)[start:]]
+
+    def pages(self, size):
+        return max((len(self) + size - 1) // size, 1)
@@ -0,0 +1,92 @@
+# utils/routing.py
+import json
+import numpy as np
+from utils import scoring
+
+CENTROIDS_FILE = 'centroids.json'
+
+class CategoryRouter:
+    """
+    Per-category centroids of resume embeddings and TF-IDF vectors, used like
+    the coarse quantiser of an IVF index: a JD is compared with every centroid
+    and only the resumes of its n_probe nearest categories are searched.
+    Centroids are scored with the hybrid weights of their two parts, so
+    categories rank the way their resumes would on average.
+    """
+
+    def __init__(self, categories, embeddings, terms, idf):
+        self.categories = list(categories)
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.terms = terms
+        self.idf = idf
+        # Dense categories x terms matrix, so a query is scored with one product
+        self._columns = {term: j for j, term in enumerate(idf)}
+        self._weights = np.zeros((len(self.categories), len(idf)), dtype=np.float32)
+        for c, category in enumerate(self.categories):
+            for term, weight in terms[category].items():
+                self._weights[c, self._columns[term]] = weight
+        self._idf = np.array(list(idf.values()), dtype=np.float32)
+
+    @classmethod
+    def build(cls, embeddings, categories, texts, top_terms=2000):
+        """
+        Centroids from normalised resume embeddings and scoring texts, with
+        categories[i] the label of row i. Each TF-IDF centroid keeps its
+        top_terms heaviest terms.
+        """
+        names = sorted(set(categories))
+        labels = np.array([names.index(category) for category in categories])
+        # Terms in a single resume say little about a category; a one-resume corpus keeps them all
+        vectorizer = scoring._tfidf_vectorizer(min_df=2 if len(texts) > 1 else 1)
+        vectors = vectorizer.fit_transform(texts).tocsr()
+        vocabulary = vectorizer.get_feature_names_out()
+
+        centroids, terms, kept = [], {}, set()
+        for c, name in enumerate(names):
+            rows = np.flatnonzero(labels == c)
+            centroid = np.asarray(embeddings[rows], dtype=np.float32).mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+
+            weights = np.asarray(vectors[rows].mean(axis=0)).ravel()
+            top = np.argpartition(-weights, min(top_terms, len(weights)) - 1)[:top_terms]
+            top = top[weights[top] > 0]
+            norm = max(np.linalg.norm(weights[top]), 1e-12)
+            terms[name] = {vocabulary[j]: round(float(weights[j] / norm), 6) for j in top}
+            kept.update(top.tolist())
+        idf = {vocabulary[j]: round(float(vectorizer.idf_[j]), 6) for j in sorted(kept)}
+        return cls(names, np.stack(centroids), terms, idf)
+
+    def scores(self, jd, st_model):
+        """
+        {category: routing score} for a scoring.JobDescription.
+        """
+        semantic = self.embeddings @ jd.embed(st_model) * 100
+        columns = np.fromiter((self._columns[term] for term in jd.ngrams if term in self._columns), dtype=np.int64)
+        tfidf = np.zeros(len(self.categories), dtype=np.float32)
+        if len(columns):
+            columns, counts = np.unique(columns, return_counts=True)
+            query = counts * self._idf[columns]
+            tfidf = self._weights[:, columns] @ query / np.linalg.norm(query) * 100
+        return {category: 0.5 * float(s) + 0.3 * float(t) for category, s, t in zip(self.categories, semantic, tfidf)}
+
+    def route(self, jd, st_model, n_probe):
+        """
+        The n_probe categories nearest to the JD, best first.
+        """
+        scores = self.scores(jd, st_model)
+        return sorted(scores, key=lambda category: (-scores[category], category))[:n_probe]
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'categories': self.categories,
+                'embeddings': self.embeddings.round(6).tolist(),
+                'terms': self.terms,
+                'idf': self.idf
+            }, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['categories'], data['embeddings'], data['terms'], data['idf'])
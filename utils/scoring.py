@@ -1,25 +1,327 @@
 # utils/scoring.py
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sentence_transformers import SentenceTransformer, util
+# sklearn, torch and sentence-transformers take seconds to import, so they are
+# imported inside the functions that need them rather than at module load.
+from __future__ import annotations
 
-def load_st_model(model_name: str = "all-MiniLM-L6-v2") -> SentenceTransformer:
+import json
+import heapq
+import hashlib
+import logging
+import threading
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING
+import numpy as np
+from utils import metrics
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sentence_transformers import SentenceTransformer
+
+
+_tfidf_analyzer = None
+
+def tfidf_ngrams(text: str) -> list:
+    """
+    The stop-word-filtered 1-3 gram terms TF-IDF vectorises text into.
+    """
+    global _tfidf_analyzer
+    if _tfidf_analyzer is None:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        _tfidf_analyzer = TfidfVectorizer(stop_words='english', ngram_range=(1, 3)).build_analyzer()
+    return _tfidf_analyzer(text)
+
+
+def _analyze(doc):
+    # Documents that are already lists of terms (a JobDescription's ngrams) skip analysis
+    return doc if isinstance(doc, list) else tfidf_ngrams(doc)
+
+
+def _tfidf_vectorizer(**options) -> TfidfVectorizer:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    return TfidfVectorizer(analyzer=_analyze, **options)
+
+
+def model_spec(st_model) -> tuple:
+    """
+    (model name, backend) of a model from load_st_model, a CachedEncoder or a
+    model server client; None when unknown.
+    """
+    spec = getattr(st_model, 'model_spec', None)
+    return tuple(spec) if spec is not None else None
+
+
+class JobDescription:
+    """
+    Everything scoring needs from the JD side, computed once: the cleaned text,
+    its skills, its TF-IDF terms and (once a model has embedded it) its
+    L2-normalised embedding, tagged with the model_spec that produced it.
+    Scoring functions accept one of these wherever they take a JD's text.
+    """
+
+    def __init__(self, cleaned: str, skills: list, ngrams: list = None, embedding: np.ndarray = None,
+                 embedding_model: tuple = None):
+        self.cleaned = cleaned
+        self.skills = skills
+        self.ngrams = tfidf_ngrams(cleaned) if ngrams is None else ngrams
+        self.embedding = embedding
+        self.embedding_model = tuple(embedding_model) if embedding_model is not None else None
+
+    def embedded_by(self, st_model: SentenceTransformer) -> bool:
+        return self.embedding is not None and self.embedding_model == model_spec(st_model)
+
+    def embed(self, st_model: SentenceTransformer) -> np.ndarray:
+        """
+        The embedding from st_model, recomputed if it came from another model or backend.
+        """
+        if not self.embedded_by(st_model):
+            self.embedding = encode_texts([self.cleaned], st_model)[0]
+            self.embedding_model = model_spec(st_model)
+        return self.embedding
+
+
+def _jd_document(jd):
+    return jd.ngrams if isinstance(jd, JobDescription) else jd
+
+
+MODEL_BACKENDS = ('torch', 'int8', 'onnx')
+
+
+def quantize_int8(model: SentenceTransformer) -> SentenceTransformer:
+    """
+    Copy of a model with every Linear layer dynamically quantised to int8 for
+    CPU inference: weights are stored as int8 and activations are quantised
+    on the fly, so no calibration data is needed.
     """
-    Load a sentence transformer model.
+    import torch
+    model = model.to('cpu')
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_st_model(
+    model_name: str = "all-MiniLM-L6-v2",
+    allow_download: bool = True,
+    backend: str = 'torch'
+) -> SentenceTransformer:
+    """
+    Load a sentence transformer model, preferring the local cache so no network
+    access happens when the model is already present. backend is 'torch'
+    (fp32), 'int8' (dynamic int8 quantisation) or 'onnx' (exported ONNX graph
+    run by onnxruntime; needs `pip install optimum[onnxruntime]`).
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"Unknown model backend {backend!r}; expected one of {', '.join(MODEL_BACKENDS)}")
+    from sentence_transformers import SentenceTransformer
+    options = {'backend': 'onnx'} if backend == 'onnx' else {}
+    try:
+        model = SentenceTransformer(model_name, local_files_only=True, **options)
+    except Exception:
+        if not allow_download:
+            raise
+        logging.info(f"Model {model_name} not cached locally, downloading")
+        model = SentenceTransformer(model_name, **options)
+    if backend == 'int8':
+        model = quantize_int8(model)
+    model.model_spec = (model_name, backend)
+    return model
+
+
+class BackgroundModel:
+    """
+    Loads a SentenceTransformer in a background thread and runs a warmup
+    inference, so importing the app does not block on torch initialisation.
+    """
+
+    def __init__(self, model_name: str, allow_download: bool = True, warmup: bool = True, backend: str = 'torch'):
+        self.model_name = model_name
+        self.backend = backend
+        self.model = None
+        self.error = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._load, args=(allow_download, warmup), name='st-model-loader', daemon=True
+        )
+        self._thread.start()
+
+    def _load(self, allow_download: bool, warmup: bool):
+        try:
+            model = load_st_model(self.model_name, allow_download, self.backend)
+            if warmup:
+                with metrics.timer('model_warmup'):
+                    model.encode(['warmup'], convert_to_numpy=True)
+            self.model = model
+        except Exception as e:
+            logging.error(f"Could not load model {self.model_name}: {e}")
+            self.error = e
+        finally:
+            self._ready.set()
+
+    def ready(self) -> bool:
+        return self._ready.is_set() and self.error is None
+
+    def get(self, timeout: float = None) -> SentenceTransformer:
+        """
+        Block until the model is loaded and return it.
+        """
+        if not self._ready.wait(timeout):
+            raise TimeoutError(f"Model {self.model_name} is still loading")
+        if self.error is not None:
+            raise RuntimeError(f"Model {self.model_name} failed to load") from self.error
+        return self.model
+
+
+class CachedEncoder:
     """
-    return SentenceTransformer(model_name)
+    Wraps a SentenceTransformer with an LRU cache of embeddings keyed by text,
+    so resumes and JDs seen before are not encoded again. Cache misses are
+    encoded in one batched call, and cached rows are returned in the form the
+    caller asked for (numpy or tensor, raw or normalised).
+    """
+
+    def __init__(self, model: SentenceTransformer, max_entries: int = 4096):
+        self.model = model
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs):
+        kwargs.pop('convert_to_numpy', None)
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return self.model.encode(texts, batch_size=batch_size, convert_to_tensor=convert_to_tensor,
+                                     normalize_embeddings=normalize_embeddings, **kwargs)
+
+        keys = [hashlib.sha1(text.encode('utf-8')).digest() for text in texts]
+        found, missing = {}, {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+                else:
+                    missing[key] = text
+        metrics.increment('embedding_cache_total', len(texts) - len(missing), result='hit')
+        metrics.increment('embedding_cache_total', len(missing), result='miss')
+
+        if missing:
+            encoded = np.asarray(self.model.encode(list(missing.values()), batch_size=batch_size,
+                                                   convert_to_numpy=True, **kwargs), dtype=np.float32)
+            with self._lock:
+                for key, row in zip(missing, encoded):
+                    found[key] = self._cache[key] = row
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        embeddings = np.stack([found[key] for key in keys])
+        if normalize_embeddings:
+            embeddings = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if convert_to_tensor:
+            import torch
+            embeddings = torch.from_numpy(embeddings)
+        return embeddings[0] if single else embeddings
 
 
+@metrics.timed('tfidf')
 def compute_tfidf_score(resume_text: str, jd_text: str) -> float:
     """
     Compute TF-IDF cosine similarity score between resume and job description.
     """
-    vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 3))
+    from sklearn.metrics.pairwise import cosine_similarity
+    vectorizer = _tfidf_vectorizer()
     vectors = vectorizer.fit_transform([resume_text, jd_text])
     return cosine_similarity(vectors[0], vectors[1])[0][0] * 100
 
 
+class TfidfReference:
+    """
+    TF-IDF weights with the IDF fitted once on a reference corpus, for scoring
+    any number of later batches. Terms outside the reference vocabulary get the
+    IDF of a term no reference document contains and still count towards each
+    document's norm and its overlap with the JD, so a resume gets the same
+    score whichever batch it is scored in.
+    """
+
+    def __init__(self, terms: list, idf: list, documents: int):
+        self.terms = list(terms)
+        self.idf = [float(value) for value in idf]
+        self.documents = documents
+        self.vocabulary = {term: j for j, term in enumerate(self.terms)}
+        # sklearn's smoothed IDF for a document frequency of zero
+        self.unseen_idf = float(np.log(1 + documents) + 1)
+
+    @classmethod
+    def fit(cls, corpus: list, min_df: int = 1) -> TfidfReference:
+        vectorizer = _tfidf_vectorizer(min_df=min_df)
+        vectorizer.fit(corpus)
+        return cls(vectorizer.get_feature_names_out().tolist(), vectorizer.idf_, len(corpus))
+
+    def weights(self, document) -> dict:
+        """
+        {term: L2-normalised TF-IDF weight} over every term of a text or term list.
+        """
+        weights = {}
+        for term, count in Counter(_analyze(document)).items():
+            j = self.vocabulary.get(term)
+            weights[term] = count * (self.idf[j] if j is not None else self.unseen_idf)
+        norm = np.sqrt(sum(w * w for w in weights.values()))
+        return {term: w / norm for term, w in weights.items()} if norm else weights
+
+    def similarities(self, documents: list, jd_document) -> list:
+        jd_weights = self.weights(jd_document)
+        scores = []
+        for document in documents:
+            weights = self.weights(document)
+            if len(weights) > len(jd_weights):
+                scores.append(sum(w * weights.get(term, 0.0) for term, w in jd_weights.items()))
+            else:
+                scores.append(sum(w * jd_weights.get(term, 0.0) for term, w in weights.items()))
+        return scores
+
+    def save(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'documents': self.documents, 'terms': self.terms, 'idf': [round(v, 6) for v in self.idf]},
+                      f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str) -> TfidfReference:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data['terms'], data['idf'], data['documents'])
+
+
+def fit_tfidf_vectorizer(corpus: list, min_df: int = 1) -> TfidfReference:
+    """
+    Fit TF-IDF weights on a reference corpus so they can be reused across batches.
+    """
+    return TfidfReference.fit(corpus, min_df)
+
+
+@metrics.timed('tfidf')
+def compute_tfidf_scores(resume_texts: list, jd: str | JobDescription, vectorizer: TfidfReference = None) -> list:
+    """
+    Compute TF-IDF cosine similarity of many resumes against one job description.
+    With a TfidfReference its fixed IDF is used. Otherwise IDF is fitted over
+    the JD plus all resumes, rows are L2-normalised and every score comes out
+    of one sparse matrix-vector product. A JobDescription's terms are reused,
+    not re-analysed.
+    """
+    if not resume_texts:
+        return []
+    jd_document = _jd_document(jd)
+    if vectorizer is not None:
+        return [score * 100 for score in vectorizer.similarities(resume_texts, jd_document)]
+    vectorizer = _tfidf_vectorizer()
+    vectors = vectorizer.fit_transform([jd_document] + list(resume_texts))
+    jd_vector, resume_vectors = vectors[0], vectors[1:]
+    return ((resume_vectors @ jd_vector.T).toarray()[:, 0] * 100).tolist()
+
+
+@metrics.timed('skill_score')
 def compute_skill_score(resume_skills: list, jd_skills: list) -> float:
     """
     Calculate skill match percentage.
@@ -30,15 +332,243 @@ def compute_skill_score(resume_skills: list, jd_skills: list) -> float:
     return len(matched) / len(jd_skills) * 100
 
 
+@metrics.timed('semantic')
 def compute_semantic_similarity(resume_text: str, jd_text: str, st_model: SentenceTransformer) -> float:
     """
     Compute semantic similarity using a SentenceTransformer model.
     """
-    emb_resume = st_model.encode(resume_text, convert_to_tensor=True)
-    emb_jd = st_model.encode(jd_text, convert_to_tensor=True)
+    from sentence_transformers import util
+    with metrics.timer('model_inference'):
+        emb_resume = st_model.encode(resume_text, convert_to_tensor=True)
+        emb_jd = st_model.encode(jd_text, convert_to_tensor=True)
     return util.cos_sim(emb_resume, emb_jd).item() * 100
 
 
+@metrics.timed('semantic')
+def compute_semantic_similarities(
+    resume_texts: list,
+    jd: str | JobDescription,
+    st_model: SentenceTransformer,
+    batch_size: int = 32
+) -> list:
+    """
+    Compute semantic similarity of many resumes against one job description.
+    The JD is embedded once, the resumes are encoded in a single batched call
+    and all cosine scores are computed as one matrix operation. A
+    JobDescription's stored embedding is used instead of re-encoding the JD.
+    """
+    if not resume_texts:
+        return []
+    if isinstance(jd, JobDescription):
+        jd_embedding = jd.embed(st_model)
+        return (encode_texts(resume_texts, st_model, batch_size) @ jd_embedding * 100).astype(np.float64).tolist()
+    from sentence_transformers import util
+    with metrics.timer('model_inference'):
+        emb_jd = st_model.encode(jd, convert_to_tensor=True)
+        emb_resumes = st_model.encode(resume_texts, batch_size=batch_size, convert_to_tensor=True)
+    return (util.cos_sim(emb_resumes, emb_jd)[:, 0] * 100).tolist()
+
+
+def encode_texts(texts: list, st_model: SentenceTransformer, batch_size: int = 32) -> np.ndarray:
+    """
+    Encode texts into L2-normalised float32 embeddings, so cosine similarity is a dot product.
+    """
+    with metrics.timer('model_inference'):
+        embeddings = st_model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True
+        )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+@metrics.timed('hybrid_score')
+def hybrid_scores_tfidf_st(
+    resume_texts: list,
+    jd: str | JobDescription,
+    resume_skills_list: list,
+    jd_skills: list,
+    st_model: SentenceTransformer,
+    batch_size: int = 32,
+    vectorizer: TfidfReference = None
+) -> list:
+    """
+    Calculate hybrid scores for a batch of resumes against one job description.
+    Weights: 0.5 (Semantic) + 0.3 (TF-IDF) + 0.2 (Skill Match)
+    """
+    st_scores = compute_semantic_similarities(resume_texts, jd, st_model, batch_size)
+    tfidf_scores = compute_tfidf_scores(resume_texts, jd, vectorizer)
+    scores = []
+    for resume_skills, st_score, tfidf_score in zip(resume_skills_list, st_scores, tfidf_scores):
+        skill_score = compute_skill_score(resume_skills, jd_skills)
+        final_score = 0.5 * st_score + 0.3 * tfidf_score + 0.2 * skill_score
+        scores.append(round(final_score, 2))
+    return scores
+
+
+def stage_one_score(tfidf_score: float, skill_score: float) -> float:
+    """
+    The TF-IDF and skill part of the hybrid score. Semantic similarity only
+    adds to it, so this is a lower bound on the full score for any resume whose
+    embedding is not anti-correlated with the JD.
+    """
+    return 0.3 * tfidf_score + 0.2 * skill_score
+
+
+class CascadeCutoff:
+    """
+    Stage-two selection for cascade_scores_tfidf_st that carries over from one
+    batch to the next. A resume is embedded when its stage-one score is among
+    the top_n seen so far in the run, or at or above threshold; a min-heap
+    keeps the current top_n. Share one cutoff across the chunks of a run so
+    chunking does not reset it. Within a single batch this picks exactly the
+    top_n, ties going to the earlier resume.
+    """
+
+    def __init__(self, top_n=None, threshold=None):
+        self.top_n = top_n
+        self.threshold = threshold
+        self._heap = []
+
+    def select(self, first):
+        """
+        Indices of the stage-one scores in first that go on to stage two.
+        """
+        if self.top_n is None and self.threshold is None:
+            return list(range(len(first)))
+        keep = set()
+        if self.threshold is not None:
+            keep.update(i for i, score in enumerate(first) if score >= self.threshold)
+        if self.top_n:
+            for i in sorted(range(len(first)), key=lambda i: first[i], reverse=True):
+                if len(self._heap) < self.top_n:
+                    heapq.heappush(self._heap, first[i])
+                elif first[i] > self._heap[0]:
+                    heapq.heapreplace(self._heap, first[i])
+                else:
+                    break
+                keep.add(i)
+        return sorted(keep)
+
+
+@metrics.timed('cascade_score')
+def cascade_scores_tfidf_st(
+    resume_texts: list,
+    jd: str | JobDescription,
+    resume_skills_list: list,
+    jd_skills: list,
+    st_model: SentenceTransformer,
+    top_n: int = None,
+    threshold: float = None,
+    batch_size: int = 32,
+    vectorizer: TfidfReference = None,
+    cutoff: CascadeCutoff = None
+) -> list:
+    """
+    Two-stage hybrid scoring. Every resume gets the cheap TF-IDF and skill
+    scores; only the top_n of those, plus any at or above threshold, are
+    embedded for the semantic score. Returns (score, stage) pairs where stage
+    is 'semantic' for the full hybrid score and 'filter' for resumes that
+    stopped at stage one and carry the stage-one score as a lower bound.
+    With neither top_n nor threshold set every resume reaches stage two.
+    A CascadeCutoff passed as cutoff replaces top_n and threshold and keeps
+    its top_n across calls.
+    """
+    tfidf_scores = compute_tfidf_scores(resume_texts, jd, vectorizer)
+    skill_scores = [compute_skill_score(resume_skills, jd_skills) for resume_skills in resume_skills_list]
+    first = [stage_one_score(t, k) for t, k in zip(tfidf_scores, skill_scores)]
+
+    if cutoff is None:
+        cutoff = CascadeCutoff(top_n, threshold)
+    survivors = cutoff.select(first)
+
+    st_scores = dict(zip(survivors, compute_semantic_similarities(
+        [resume_texts[i] for i in survivors], jd, st_model, batch_size
+    )))
+    metrics.increment('resume_cascade_total', len(survivors), stage='semantic')
+    metrics.increment('resume_cascade_total', len(first) - len(survivors), stage='filter')
+
+    results = []
+    for i, (tfidf_score, skill_score) in enumerate(zip(tfidf_scores, skill_scores)):
+        if i in st_scores:
+            final_score = 0.5 * st_scores[i] + 0.3 * tfidf_score + 0.2 * skill_score
+            results.append((round(final_score, 2), 'semantic'))
+        else:
+            results.append((round(first[i], 2), 'filter'))
+    return results
+
+
+@metrics.timed('score_matrix')
+def hybrid_score_matrix(
+    resume_texts: list,
+    jds: list,
+    resume_skills_list: list,
+    jd_skills_list: list,
+    st_model: SentenceTransformer,
+    batch_size: int = 32
+) -> np.ndarray:
+    """
+    Hybrid scores of N resumes against M job descriptions as an N x M matrix.
+    Every document is vectorised and embedded exactly once: one TF-IDF fit over
+    all JDs and resumes, one batched encode per side, and the semantic, TF-IDF
+    and skill terms are each a single matrix product. jds may be texts or
+    JobDescriptions; when all are JobDescriptions their stored terms and
+    embeddings are used.
+    """
+    n, m = len(resume_texts), len(jds)
+    if not n or not m:
+        return np.zeros((n, m), dtype=np.float64)
+
+    vectorizer = _tfidf_vectorizer()
+    vectors = vectorizer.fit_transform([_jd_document(jd) for jd in jds] + list(resume_texts))
+    with metrics.timer('tfidf'):
+        tfidf = (vectors[m:] @ vectors[:m].T).toarray() * 100
+
+    with metrics.timer('semantic'):
+        if all(isinstance(jd, JobDescription) for jd in jds):
+            missing = [jd for jd in jds if not jd.embedded_by(st_model)]
+            if missing:
+                for jd, embedding in zip(missing, encode_texts([jd.cleaned for jd in missing], st_model, batch_size)):
+                    jd.embedding, jd.embedding_model = embedding, model_spec(st_model)
+            jd_embeddings = np.stack([jd.embedding for jd in jds])
+        else:
+            jd_embeddings = encode_texts(jds, st_model, batch_size)
+        semantic = encode_texts(resume_texts, st_model, batch_size) @ jd_embeddings.T
+        semantic = semantic.astype(np.float64) * 100
+
+    with metrics.timer('skill_score'):
+        vocabulary = {}
+        for jd_skills in jd_skills_list:
+            for skill in jd_skills:
+                vocabulary.setdefault(skill, len(vocabulary))
+        jd_matrix = np.zeros((m, len(vocabulary)))
+        for j, jd_skills in enumerate(jd_skills_list):
+            jd_matrix[j, [vocabulary[skill] for skill in set(jd_skills)]] = 1
+        resume_matrix = np.zeros((n, len(vocabulary)))
+        for i, resume_skills in enumerate(resume_skills_list):
+            resume_matrix[i, [vocabulary[skill] for skill in set(resume_skills) if skill in vocabulary]] = 1
+        jd_counts = np.array([len(jd_skills) for jd_skills in jd_skills_list], dtype=np.float64)
+        matched = resume_matrix @ jd_matrix.T
+        skill = np.divide(matched * 100, jd_counts, out=np.zeros_like(matched), where=jd_counts > 0)
+
+    return np.round(0.5 * semantic + 0.3 * tfidf + 0.2 * skill, 2)
+
+
+def top_candidates(score_matrix: np.ndarray, k: int = 10) -> list:
+    """
+    For each JD column, the (resume index, score) pairs of its k best resumes, best first.
+    """
+    n = score_matrix.shape[0]
+    k = min(k, n)
+    top = []
+    for column in score_matrix.T:
+        if k <= 0:
+            top.append([])
+            continue
+        best = np.argpartition(-column, k - 1)[:k]
+        best = best[np.lexsort((best, -column[best]))]
+        top.append([(int(i), float(column[i])) for i in best])
+    return top
+
+
 def hybrid_score_tfidf_st(
     resume_text: str,
     jd_text: str,
@@ -50,9 +580,6 @@ def hybrid_score_tfidf_st(
     Calculate a hybrid score based on semantic, TF-IDF, and skill match.
     Weights: 0.5 (Semantic) + 0.3 (TF-IDF) + 0.2 (Skill Match)
     """
-    tfidf_score = compute_tfidf_score(resume_text, jd_text)
-    skill_score = compute_skill_score(resume_skills, jd_skills)
-    st_score = compute_semantic_similarity(resume_text, jd_text, st_model)
+    return hybrid_scores_tfidf_st([resume_text], jd_text, [resume_skills], jd_skills, st_model)[0]
+
 
-    final_score = 0.5 * st_score + 0.3 * tfidf_score + 0.2 * skill_score
-    return round(final_score, 2)
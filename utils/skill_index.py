@@ -0,0 +1,231 @@
+# utils/skill_index.py
+import re
+import json
+import numpy as np
+
+SKILL_INDEX_FILE = 'skills.json'
+
+# Operators are case-insensitive words; ',' is shorthand for AND. Bare words
+# between operators are joined, so multi-word skills need no quotes.
+_TOKEN_RE = re.compile(r'\s*(?:(\()|(\))|(,)|"([^"]*)"|([^\s(),"]+))')
+_OPERATORS = {'and': 'AND', 'or': 'OR', 'not': 'NOT', '&': 'AND', '|': 'OR', '!': 'NOT'}
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+class SkillIndex:
+    """
+    Inverted index from skill to the set of resume ids that list it, each set
+    stored as an int bitset. Boolean queries are a few big-int ANDs/ORs, and
+    per-category skill counts are popcounts of intersections. Resumes can be
+    added (or re-added with new skills) one at a time.
+    """
+
+    def __init__(self, skills_list=()):
+        self.skills = {skill: 0 for skill in skills_list}
+        self.categories = {}
+        self.keys = []
+        self.ids = {}
+        self.all = 0
+
+    def __len__(self):
+        return _popcount(self.all)
+
+    def add(self, key, skills, category=None):
+        """
+        Index one resume under key and return its id. Re-adding a key replaces
+        its skills, and its category too when one is given.
+        """
+        doc_id = self.ids.get(key)
+        if doc_id is None:
+            doc_id = self.ids[key] = len(self.keys)
+            self.keys.append(key)
+        else:
+            self._clear(doc_id, categories=category is not None)
+        bit = 1 << doc_id
+        for skill in set(skills):
+            self.skills[skill] = self.skills.get(skill, 0) | bit
+        if category is not None:
+            self.categories[category] = self.categories.get(category, 0) | bit
+        self.all |= bit
+        return doc_id
+
+    def remove(self, key):
+        doc_id = self.ids.get(key)
+        if doc_id is not None:
+            self._clear(doc_id)
+            self.all &= ~(1 << doc_id)
+
+    def _clear(self, doc_id, categories=True):
+        mask = ~(1 << doc_id)
+        for table in (self.skills, self.categories) if categories else (self.skills,):
+            for name, bits in table.items():
+                table[name] = bits & mask
+
+    def query(self, expression):
+        """
+        Evaluate a boolean skill query such as "python AND docker, NOT php" or
+        "(java OR kotlin) AND machine learning" and return the matching bitset.
+        Raises ValueError for syntax errors and skills that are not indexed.
+        """
+        tokens = self._tokenize(expression)
+        if not tokens:
+            return self.all
+        pos = 0
+
+        def peek():
+            return tokens[pos] if pos < len(tokens) else None
+
+        def take():
+            nonlocal pos
+            pos += 1
+            return tokens[pos - 1]
+
+        def parse_or():
+            bits = parse_and()
+            while peek() == ('op', 'OR'):
+                take()
+                bits |= parse_and()
+            return bits
+
+        def parse_and():
+            bits = parse_not()
+            while peek() == ('op', 'AND'):
+                take()
+                bits &= parse_not()
+            return bits
+
+        def parse_not():
+            if peek() == ('op', 'NOT'):
+                take()
+                return self.all & ~parse_not()
+            return parse_atom()
+
+        def parse_atom():
+            token = peek()
+            if token is None:
+                raise ValueError('query ends unexpectedly')
+            kind, value = take()
+            if kind == 'open':
+                bits = parse_or()
+                if peek() != ('close', ')'):
+                    raise ValueError("missing ')'")
+                take()
+                return bits
+            if kind != 'skill':
+                raise ValueError(f"unexpected {value!r}")
+            if value not in self.skills:
+                raise ValueError(f"unknown skill {value!r}")
+            return self.skills[value]
+
+        bits = parse_or()
+        if pos != len(tokens):
+            raise ValueError(f"unexpected {tokens[pos][1]!r}")
+        return bits
+
+    def _tokenize(self, expression):
+        tokens, words = [], []
+
+        def flush_words():
+            if words:
+                tokens.append(('skill', ' '.join(words)))
+                words.clear()
+
+        pos = 0
+        expression = expression.strip()
+        while pos < len(expression):
+            match = _TOKEN_RE.match(expression, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"cannot parse query at {expression[pos:]!r}")
+            pos = match.end()
+            open_paren, close_paren, comma, quoted, word = match.groups()
+            if word is not None and word.lower() not in _OPERATORS:
+                words.append(word.lower())
+                continue
+            flush_words()
+            if open_paren:
+                tokens.append(('open', '('))
+            elif close_paren:
+                tokens.append(('close', ')'))
+            elif comma:
+                tokens.append(('op', 'AND'))
+            elif quoted is not None:
+                tokens.append(('skill', quoted.strip().lower()))
+            else:
+                tokens.append(('op', _OPERATORS[word.lower()]))
+        flush_words()
+        return tokens
+
+    def to_ids(self, bits):
+        """
+        Sorted numpy array of the resume ids set in a bitset.
+        """
+        if not bits:
+            return np.zeros(0, dtype=np.int64)
+        raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(raw, bitorder='little'))
+
+    def matches(self, expression):
+        return [self.keys[i] for i in self.to_ids(self.query(expression))]
+
+    def skill_counts(self, bits=None):
+        """
+        Number of resumes listing each skill, optionally within a bitset.
+        """
+        bits = self.all if bits is None else bits
+        return {skill: _popcount(skill_bits & bits) for skill, skill_bits in self.skills.items()
+                if skill_bits & bits}
+
+    def category_skill_counts(self):
+        """
+        {category: {skill: resumes}} for every category, most common skills first.
+        """
+        stats = {}
+        for category, category_bits in sorted(self.categories.items()):
+            counts = self.skill_counts(category_bits & self.all)
+            stats[category] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return stats
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'keys': self.keys,
+                'all': format(self.all, 'x'),
+                'skills': {skill: format(bits, 'x') for skill, bits in self.skills.items()},
+                'categories': {category: format(bits, 'x') for category, bits in self.categories.items()}
+            }, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        index.keys = data['keys']
+        index.ids = {key: i for i, key in enumerate(index.keys)}
+        index.all = int(data['all'], 16)
+        index.skills = {skill: int(bits, 16) for skill, bits in data['skills'].items()}
+        index.categories = {category: int(bits, 16) for category, bits in data['categories'].items()}
+        return index
+
+if __name__ == '__main__':
+    import os
+    import argparse
+    import config
+
+    parser = argparse.ArgumentParser(description='Query the skill index written by `python -m utils.index`.')
+    parser.add_argument('query', nargs='?', default='', help='e.g. "python AND docker, NOT php"')
+    parser.add_argument('--index', default=config.INDEX_DIR, help='index directory')
+    parser.add_argument('--stats', action='store_true', help='print skill counts per category')
+    args = parser.parse_args()
+
+    index = SkillIndex.load(os.path.join(args.index, SKILL_INDEX_FILE))
+    try:
+        matches = index.matches(args.query)
+    except ValueError as e:
+        parser.error(str(e))
+    for key in matches:
+        print(key)
+    if args.stats:
+        for category, counts in index.category_skill_counts().items():
+            top = ', '.join(f'{skill} ({count})' for skill, count in list(counts.items())[:10])
+            print(f'{category}: {top}')